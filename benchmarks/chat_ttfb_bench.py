@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+
+# Time to first byte of the blocking /api/chat endpoint versus the streaming
+# /api/chat/stream endpoint. For the stream, "first token" is the first chunk
+# of answer text and "first event" is the first tool or token event.
+#
+# Usage (web backend and MCP server running):
+#   python -m benchmarks.chat_ttfb_bench --iterations 5
+
+BASE_URL = "http://localhost:8000/api"
+
+PROMPTS = [
+    "What is the weather in Tokyo?",
+    "What is the weather in Paris and in London?",
+    "Tell me a fun fact about airports.",
+]
+
+async def measure_blocking(client, base_url, prompt):
+    start = time.perf_counter()
+    async with client.stream("POST", f"{base_url}/chat", json={"message": prompt}) as response:
+        response.raise_for_status()
+        first_byte = None
+        async for _ in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+    return {"first_byte": first_byte, "first_event": first_byte, "first_token": first_byte, "total": time.perf_counter() - start}
+
+async def measure_streaming(client, base_url, prompt):
+    start = time.perf_counter()
+    result = {"first_byte": None, "first_event": None, "first_token": None}
+    async with client.stream("POST", f"{base_url}/chat/stream", json={"message": prompt}) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            elapsed = time.perf_counter() - start
+            if result["first_byte"] is None:
+                result["first_byte"] = elapsed
+            if not line.startswith("data:"):
+                continue
+            event = json.loads(line[5:])
+            if event["type"] in ("tool_start", "token") and result["first_event"] is None:
+                result["first_event"] = elapsed
+            if event["type"] == "token" and result["first_token"] is None:
+                result["first_token"] = elapsed
+            if event["type"] == "error":
+                raise RuntimeError(event["detail"])
+    result["total"] = time.perf_counter() - start
+    return result
+
+def report(name, samples):
+    row = f"{name:<12}"
+    for key in ("first_byte", "first_event", "first_token", "total"):
+        values = [s[key] for s in samples if s[key] is not None]
+        row += f"{statistics.median(values) * 1000:>12.0f}ms" if values else f"{'-':>14}"
+    print(row)
+
+async def run(args):
+    print(f"{len(PROMPTS)} prompts x {args.iterations} iterations against {args.base_url} (medians)\n")
+    print(f"{'endpoint':<12}{'first byte':>14}{'first event':>14}{'first token':>14}{'total':>14}")
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        for name, measure in (("blocking", measure_blocking), ("streaming", measure_streaming)):
+            samples = []
+            for _ in range(args.iterations):
+                for prompt in PROMPTS:
+                    samples.append(await measure(client, args.base_url, prompt))
+            report(name, samples)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare time to first byte of blocking and streaming chat.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--iterations", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
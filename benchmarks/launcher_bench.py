@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import httpx
+
+from loadtest.util import percentile, start, stop, wait_until_ready
+
+# Throughput of the dev launchers (`python -m <module>`, reload + debug) versus
+# the production launcher (`python serve.py <service>`), measured by hammering a
+# cheap endpoint of the service with concurrent keep-alive clients.
+#
+# Usage:
+#   python -m benchmarks.launcher_bench server --concurrency 64 --duration 10
+#   python -m benchmarks.launcher_bench web
+
+SERVICES = {
+    "server": {"dev": [sys.executable, "-m", "server.app"], "port": 8001, "path": "/stats"},
+    "web": {"dev": [sys.executable, "-m", "web_client.backend.main"], "port": 8000, "path": "/api/history"},
+}
+
+async def hammer(url, concurrency, duration):
+    latencies = []
+    errors = 0
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                start_time = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    response.raise_for_status()
+                    latencies.append(time.perf_counter() - start_time)
+                except httpx.HTTPError:
+                    errors += 1
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 99) * 1000 if latencies else 0.0,
+    }
+
+async def run(args):
+    service = SERVICES[args.service]
+    url = f"http://127.0.0.1:{service['port']}{service['path']}"
+    launchers = {
+        "dev": service["dev"],
+        "production": [sys.executable, "serve.py", args.service] + (["--workers", str(args.workers)] if args.workers else []),
+    }
+
+    print(f"GET {url}: {args.concurrency} concurrent clients for {args.duration}s per launcher\n")
+    print(f"{'launcher':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'mean':>10}{'p50':>10}{'p99':>10}")
+
+    for name, command in launchers.items():
+        process = start(command)
+        try:
+            await wait_until_ready(url)
+            await hammer(url, args.concurrency, 1)  # warm-up
+            result = await hammer(url, args.concurrency, args.duration)
+        finally:
+            stop(process)
+        print(
+            f"{name:<12}{result['requests']:>10}{result['errors']:>8}{result['rps']:>10.1f}"
+            f"{result['mean_ms']:>8.2f}ms{result['p50_ms']:>8.2f}ms{result['p99_ms']:>8.2f}ms"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare dev and production launcher throughput.")
+    parser.add_argument("service", choices=SERVICES.keys())
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--workers", type=int, help="Worker count passed to serve.py")
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,76 @@
+import argparse
+import asyncio
+import os
+import sys
+
+from loadtest.run import UPSTREAMS_PORT, stack_env
+from loadtest.util import start, stop, wait_until_ready
+
+# Size of each tool's result in the text and compact output formats
+# (server/tools/output.py), in characters and tokens. Tokens are estimated at
+# ~4 characters per token unless --gemini is given, which asks the Gemini API
+# to count them (needs GOOGLE_API_KEY).
+#
+# Runs offline against the fake upstreams from loadtest/:
+#   python -m benchmarks.tool_tokens_bench
+#   python -m benchmarks.tool_tokens_bench --gemini
+
+CALLS = [
+    ("get_weather", {"city": "Tokyo"}),
+    ("search_flights", {"origin": "PAR", "destination": "LON", "departure_date": "2025-12-25"}),
+    ("search_hotels", {"city_code": "LON"}),
+    ("retrieve_memory", {"vector": [1.0, 0.0, 0.5, 0.2], "top_k": 3}),
+]
+
+def make_counter(use_gemini):
+    if not use_gemini:
+        return lambda text: len(text) // 4 + 1
+    import google.generativeai as genai
+    genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    return lambda text: model.count_tokens(text).total_tokens
+
+async def run(args):
+    # The tools read their endpoints at import, so point the environment at the fakes first
+    env = stack_env(history_db=os.devnull)
+    env.update({"FAKE_WEATHER_LATENCY": "fixed:0", "FAKE_AMADEUS_LATENCY": "fixed:0", "FAKE_PINECONE_LATENCY": "fixed:0"})
+    os.environ.update(env)
+    upstreams = start([sys.executable, "-m", "loadtest.upstreams", "--port", str(UPSTREAMS_PORT)], env)
+    try:
+        await wait_until_ready(f"http://127.0.0.1:{UPSTREAMS_PORT}/data/2.5/weather")
+        from server.tools import output, memory
+        from server.tools.weather import get_weather
+        from server.tools.travel import search_flights, search_hotels
+        tools = {
+            "get_weather": get_weather,
+            "search_flights": search_flights,
+            "search_hotels": search_hotels,
+            "retrieve_memory": memory.retrieve_memory,
+        }
+        for i, text in enumerate(["Prefers aisle seats on long flights", "Allergic to peanuts", "Travelling with a dog named Biscuit"]):
+            memory.store_memory(text, [1.0 - i * 0.3, 0.1 * i, 0.5, 0.2])
+
+        count = make_counter(args.gemini)
+        print(f"{'tool':<18}{'text chars':>12}{'compact chars':>15}{'text tokens':>13}{'compact tokens':>16}{'saved':>8}")
+        totals = [0, 0]
+        for name, arguments in CALLS:
+            sizes = {}
+            for fmt in ("text", "compact"):
+                output.TOOL_OUTPUT_FORMAT = fmt
+                result = await asyncio.to_thread(tools[name], **arguments)
+                if args.verbose:
+                    print(f"  [{fmt}] {result}")
+                sizes[fmt] = (len(result), count(result))
+            saved = 1 - sizes["compact"][1] / sizes["text"][1]
+            totals[0] += sizes["text"][1]
+            totals[1] += sizes["compact"][1]
+            print(f"{name:<18}{sizes['text'][0]:>12}{sizes['compact'][0]:>15}{sizes['text'][1]:>13}{sizes['compact'][1]:>16}{saved:>8.0%}")
+        print(f"{'total':<18}{'':>12}{'':>15}{totals[0]:>13}{totals[1]:>16}{1 - totals[1] / totals[0]:>8.0%}")
+    finally:
+        stop(upstreams)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare tokens per tool result in text and compact output.")
+    parser.add_argument("--gemini", action="store_true", help="count tokens with the Gemini API instead of estimating")
+    parser.add_argument("--verbose", action="store_true", help="print every result")
+    asyncio.run(run(parser.parse_args()))
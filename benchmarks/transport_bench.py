@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamable_http_client
+
+from loadtest.util import percentile
+
+# Compares the two transports exposed by server/app.py, plus the in-process
+# transport (server/inprocess.py) as the no-network baseline:
+#   - connection setup: open transport + initialize, on a fresh connection each time
+#   - tool-call latency: repeated call_tool on one already-initialized session
+#
+# Usage (server must be running on port 8001):
+#   python -m benchmarks.transport_bench --iterations 50
+
+BASE_URL = "http://localhost:8001"
+
+def inprocess(base):
+    # Imported lazily: it loads the server and all of its tools
+    from server.inprocess import inprocess_client
+    return inprocess_client()
+
+TRANSPORTS = {
+    "sse": lambda base: sse_client(f"{base}/sse"),
+    "streamable-http": lambda base: streamable_http_client(f"{base}/mcp/"),
+    "inprocess": inprocess,
+}
+
+def summarize(samples):
+    return {
+        "mean_ms": statistics.mean(samples) * 1000,
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p95_ms": percentile(samples, 95) * 1000,
+    }
+
+async def measure_setup(open_transport, iterations):
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        async with open_transport() as streams:
+            async with ClientSession(streams[0], streams[1]) as session:
+                await session.initialize()
+                samples.append(time.perf_counter() - start)
+    return samples
+
+async def measure_calls(open_transport, iterations, tool, arguments):
+    samples = []
+    async with open_transport() as streams:
+        async with ClientSession(streams[0], streams[1]) as session:
+            await session.initialize()
+            # Warm-up call so one-off costs don't skew the first sample
+            await session.call_tool(tool, arguments=arguments)
+            for _ in range(iterations):
+                start = time.perf_counter()
+                await session.call_tool(tool, arguments=arguments)
+                samples.append(time.perf_counter() - start)
+    return samples
+
+async def run(args):
+    arguments = json.loads(args.arguments)
+    print(f"Benchmarking {args.tool}({arguments}) against {args.base_url}, {args.iterations} iterations\n")
+    print(f"{'transport':<18}{'phase':<12}{'mean':>10}{'p50':>10}{'p95':>10}")
+
+    for name, factory in TRANSPORTS.items():
+        open_transport = lambda: factory(args.base_url)
+        setup = summarize(await measure_setup(open_transport, args.iterations))
+        calls = summarize(await measure_calls(open_transport, args.iterations, args.tool, arguments))
+        for phase, stats in (("setup", setup), ("call_tool", calls)):
+            print(f"{name:<18}{phase:<12}{stats['mean_ms']:>8.2f}ms{stats['p50_ms']:>8.2f}ms{stats['p95_ms']:>8.2f}ms")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare SSE, Streamable HTTP and in-process transport latency.")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--tool", default="get_weather")
+    parser.add_argument("--arguments", default='{"city": "Tokyo"}', help="Tool arguments as JSON")
+    asyncio.run(run(parser.parse_args()))
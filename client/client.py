@@ -1,10 +1,15 @@
+import argparse
 import asyncio
+import contextlib
+import json
 import os
+import time
 import warnings
 import google.generativeai as genai
 from dotenv import load_dotenv
 from mcp import ClientSession
 from mcp.client.sse import sse_client
+from loadtest.util import percentile
 
 # Suppress the Google GenAI deprecation warning
 warnings.filterwarnings("ignore", category=FutureWarning, module="google.generativeai")
@@ -17,12 +22,112 @@ genai.configure(api_key=GOOGLE_API_KEY)
 
 # Server URL (SSE Endpoint)
 SERVER_URL = "http://localhost:8001/sse"
+# "sse" connects to SERVER_URL; "inprocess" runs the MCP server inside this process
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse")
 
-async def run_client():
-    print(f"Connecting to MCP Server at {SERVER_URL}...")
+def open_transport(in_process=False):
+    if in_process:
+        # Imported lazily: it loads the server and all of its tools
+        from server.inprocess import inprocess_client
+        return inprocess_client()
+    return sse_client(SERVER_URL)
+
+def get_function_calls(response):
+    """All function calls the model asked for in this turn (it may request several at once)."""
+    return [part.function_call for part in response.candidates[0].content.parts if part.function_call]
+
+async def call_mcp_tool(session, tool_name, args, verbose=False):
+    """Call a remote tool via MCP and format its output as text."""
+    async def show_progress(progress, total, message):
+        # Slow tools send each date or page of results as it arrives
+        print(f"[Tool Progress] {tool_name} {progress:g}/{total:g}" if total else f"[Tool Progress] {tool_name} {progress:g}")
+        if message:
+            print(message)
+
+    result = await session.call_tool(tool_name, arguments=args, progress_callback=show_progress if verbose else None)
+    
+    if result.isError:
+        return f"Error: {result.content}"
+    
+    text_content = []
+    for content in result.content:
+        if content.type == 'text':
+            text_content.append(content.text)
+    return "\n".join(text_content)
+
+def build_model(mcp_tools):
+    """Gemini model that can call the given MCP tools."""
+    gemini_tools = []
+    for tool in mcp_tools:
+        gemini_tools.append({
+            "name": tool.name,
+            "description": tool.description,
+            "parameters": tool.inputSchema
+        })
+
+    return genai.GenerativeModel(
+        model_name='gemini-flash-latest',
+        tools=gemini_tools
+    )
+
+async def run_turn(session, chat, user_input, verbose=True):
+    """
+    Send one user message and resolve the tool calls it leads to.
+
+    Returns the final answer and a list of {name, latency_ms} for every tool called.
+    """
+    # We use manual function calling handling to keep control
+    # (Automatic requires tool functions to be local callables, which we don't have easily mapped)
+    response = await chat.send_message_async(user_input)
+    function_calls = get_function_calls(response)
+    tool_timings = []
+
+    # Handle Tool Calls (all calls of a turn run concurrently)
+    while function_calls:
+        calls = [(fc.name, dict(fc.args)) for fc in function_calls]
+        if verbose:
+            for tool_name, _ in calls:
+                print(f"[Gemini requested tool: {tool_name}]")
+
+        # Call remote tools via MCP
+        tool_outputs = await asyncio.gather(
+            *(timed_tool_call(session, tool_name, args, tool_timings, verbose) for tool_name, args in calls)
+        )
+
+        if verbose:
+            for tool_output in tool_outputs:
+                print(f"[Tool Output]: {tool_output[:100]}...")
+
+        # Send all responses back to Gemini in one message
+        response = await chat.send_message_async(
+            genai.protos.Content(
+                parts=[
+                    genai.protos.Part(
+                        function_response=genai.protos.FunctionResponse(
+                            name=tool_name,
+                            response={'result': tool_output}
+                        )
+                    )
+                    for (tool_name, _), tool_output in zip(calls, tool_outputs)
+                ]
+            )
+        )
+        function_calls = get_function_calls(response)
+
+    return response.text, tool_timings
+
+async def timed_tool_call(session, tool_name, args, timings, verbose=False):
+    start = time.perf_counter()
+    try:
+        return await call_mcp_tool(session, tool_name, args, verbose)
+    finally:
+        timings.append({"name": tool_name, "latency_ms": (time.perf_counter() - start) * 1000})
+
+async def run_client(in_process=False):
+    print("Starting in-process MCP Server..." if in_process else f"Connecting to MCP Server at {SERVER_URL}...")
     
     try:
-        async with sse_client(SERVER_URL) as (read, write):
+        async with open_transport(in_process) as (read, write):
             async with ClientSession(read, write) as session:
                 # Initialize
                 await session.initialize()
@@ -32,21 +137,8 @@ async def run_client():
                 mcp_tools = tools_result.tools
                 print(f"Connected! Found {len(mcp_tools)} tools: {[t.name for t in mcp_tools]}")
                 
-                # Prepare Gemini Tools
-                gemini_tools = []
-                for tool in mcp_tools:
-                    gemini_tools.append({
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.inputSchema
-                    })
-                
                 # Initialize Model
-                model = genai.GenerativeModel(
-                    model_name='gemini-flash-latest',
-                    tools=gemini_tools
-                )
-                
+                model = build_model(mcp_tools)
                 chat = model.start_chat(enable_automatic_function_calling=True)
                 
                 print("\n--- Distributed GenAI Client Started ---")
@@ -57,62 +149,119 @@ async def run_client():
                     if user_input.lower() in ['quit', 'exit']:
                         break
                     
-                    # 1. Send message to Gemini
-                    # We use manual function calling handling to keep control
-                    # (Automatic requires tool functions to be local callables, which we don't have easily mapped)
-                    
-                    response = await chat.send_message_async(user_input)
-                    
-                    part = response.candidates[0].content.parts[0]
+                    try:
+                        response_text, _ = await run_turn(session, chat, user_input)
+                    except Exception as e:
+                        print(f"Error calling tool: {e}")
+                        continue
                     
-                    # 2. Handle Tool Calls
-                    while part.function_call:
-                        fc = part.function_call
-                        tool_name = fc.name
-                        args = dict(fc.args)
-                        
-                        print(f"[Gemini requested tool: {tool_name}]")
-                        
-                        try:
-                            # Call remote tool via MCP
-                            result = await session.call_tool(tool_name, arguments=args)
-                            
-                            # Format output
-                            tool_output = ""
-                            if result.isError:
-                                tool_output = f"Error: {result.content}"
-                            else:
-                                text_content = []
-                                for content in result.content:
-                                    if content.type == 'text':
-                                        text_content.append(content.text)
-                                tool_output = "\n".join(text_content)
-                            
-                            print(f"[Tool Output]: {tool_output[:100]}...")
-                            
-                            # Send response back to Gemini
-                            response = await chat.send_message_async(
-                                genai.protos.Content(
-                                    parts=[genai.protos.Part(
-                                        function_response=genai.protos.FunctionResponse(
-                                            name=tool_name,
-                                            response={'result': tool_output}
-                                        )
-                                    )]
-                                )
-                            )
-                            part = response.candidates[0].content.parts[0]
-                            
-                        except Exception as e:
-                            print(f"Error calling tool: {e}")
-                            break
-                    
-                    # 3. Print Final Response
-                    print(f"Gemini: {response.text}")
+                    # Print Final Response
+                    print(f"Gemini: {response_text}")
                     
     except Exception as e:
         print(f"\nConnection Error: {e}")
         print("Make sure the server is running on port 8001.")
 
+def load_batch(path):
+    """
+    Read batch items from a JSONL file, one per line. Each line is either
+    {"prompt": "..."} (a full Gemini + tools turn) or
+    {"tool": "...", "arguments": {...}} (a direct MCP tool call).
+    """
+    items = []
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            item = json.loads(line)
+            if "prompt" not in item and "tool" not in item:
+                raise ValueError(f"{path}:{line_number}: expected a 'prompt' or 'tool' key")
+            items.append(item)
+    return items
+
+async def run_item(session, model, index, item):
+    start = time.perf_counter()
+    record = {"index": index}
+    try:
+        if "tool" in item:
+            record["tool"] = item["tool"]
+            record["result"] = await call_mcp_tool(session, item["tool"], item.get("arguments", {}))
+            record["ok"] = not record["result"].startswith("Error")
+        else:
+            record["prompt"] = item["prompt"]
+            # Fresh chat per prompt: batch items are independent
+            chat = model.start_chat(enable_automatic_function_calling=True)
+            record["result"], record["tool_calls"] = await run_turn(session, chat, item["prompt"], verbose=False)
+            record["ok"] = True
+    except Exception as e:
+        record["ok"] = False
+        record["error"] = str(e)
+    record["latency_ms"] = (time.perf_counter() - start) * 1000
+    return record
+
+def report(records, elapsed):
+    # Direct tool calls and the tool calls inside prompts, by tool; whole prompts as "(prompt)"
+    latencies = {}
+    for record in records:
+        name = record.get("tool", "(prompt)")
+        latencies.setdefault(name, []).append(record["latency_ms"])
+        for call in record.get("tool_calls", []):
+            latencies.setdefault(call["name"], []).append(call["latency_ms"])
+
+    errors = sum(1 for record in records if not record["ok"])
+    print(f"\n{len(records)} items in {elapsed:.2f}s: {len(records) / elapsed:.1f} items/s, {errors} errors\n")
+    print(f"{'tool':<20}{'count':>8}{'p50':>12}{'p95':>12}{'p99':>12}")
+    for name, samples in sorted(latencies.items()):
+        row = f"{name:<20}{len(samples):>8}"
+        for pct in (50, 95, 99):
+            row += f"{percentile(samples, pct):>10.1f}ms"
+        print(row)
+
+async def run_batch(args):
+    items = load_batch(args.batch)
+    print(f"Running {len(items)} items from {args.batch} over {args.sessions} session(s) at concurrency {args.concurrency}...")
+
+    async with contextlib.AsyncExitStack() as stack:
+        sessions = []
+        for _ in range(args.sessions):
+            read, write = await stack.enter_async_context(open_transport(args.in_process))
+            session = await stack.enter_async_context(ClientSession(read, write))
+            await session.initialize()
+            sessions.append(session)
+
+        model = None
+        if any("prompt" in item for item in items):
+            tools_result = await sessions[0].list_tools()
+            model = build_model(tools_result.tools)
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def run_limited(index, item):
+            async with semaphore:
+                return await run_item(sessions[index % len(sessions)], model, index, item)
+
+        start = time.perf_counter()
+        records = await asyncio.gather(*(run_limited(i, item) for i, item in enumerate(items)))
+        elapsed = time.perf_counter() - start
+
+    with open(args.out, "w") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    print(f"Results written to {args.out}")
+    report(records, elapsed)
+
 if __name__ == "__main__":
-    asyncio.run(run_client())
+    parser = argparse.ArgumentParser(description="Gemini client for the MCP server; interactive unless --batch is given.")
+    parser.add_argument("--batch", help="JSONL file of prompts or tool calls to run headless")
+    parser.add_argument("--out", default="batch_results.jsonl", help="where to write batch results (JSONL)")
+    parser.add_argument("--concurrency", type=int, default=8, help="batch items in flight at once")
+    parser.add_argument("--sessions", type=int, default=1, help="MCP sessions to spread batch items over")
+    parser.add_argument("--in-process", action="store_true", default=MCP_TRANSPORT == "inprocess",
+                        help="run the MCP server in this process instead of connecting to SERVER_URL")
+    args = parser.parse_args()
+
+    if args.batch:
+        asyncio.run(run_batch(args))
+    else:
+        asyncio.run(run_client(args.in_process))
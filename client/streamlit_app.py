@@ -1,11 +1,12 @@
 import streamlit as st
 import asyncio
 import os
+import threading
 import warnings
 import google.generativeai as genai
 from dotenv import load_dotenv
 from mcp import ClientSession
-from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamable_http_client
 from mcp.types import Tool
 
 # Suppress warnings
@@ -23,7 +24,10 @@ if not GOOGLE_API_KEY:
 genai.configure(api_key=GOOGLE_API_KEY)
 
 # Constants
-SERVER_URL = "http://localhost:8001/sse"
+# Streamable HTTP endpoint: each tool call is a plain request/response, so the
+# long-lived session below holds no stream open between messages.
+SERVER_URL = "http://localhost:8001/mcp/"
+CONNECT_TIMEOUT = 10
 
 st.set_page_config(page_title="Distributed MCP Viewer", page_icon="🤖", layout="wide")
 
@@ -56,96 +60,181 @@ for message in st.session_state.messages:
 # Chat Input
 user_input = st.chat_input("Ask me about weather, flights, or hotels...")
 
-async def run_interaction(user_query):
-    try:
-        status_placeholder.info(f"Connecting to {SERVER_URL}...")
-        
-        async with sse_client(SERVER_URL) as (read, write):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                # List tools
-                tools_result = await session.list_tools()
-                mcp_tools = tools_result.tools
-                status_placeholder.success(f"Connected! Available Tools: {len(mcp_tools)}")
-                
-                # Prepare Gemini Tools
-                gemini_tools = []
-                for tool in mcp_tools:
-                    gemini_tools.append({
-                        "name": tool.name,
-                        "description": tool.description,
-                        "parameters": tool.inputSchema
-                    })
-                
-                model = genai.GenerativeModel(
-                    model_name='gemini-flash-latest',
-                    tools=gemini_tools
-                )
-                
-                chat = model.start_chat(enable_automatic_function_calling=True)
-                
-                # 1. Send initial message
-                response = await chat.send_message_async(user_query)
-                part = response.candidates[0].content.parts[0]
-                
-                tools_used_log = []
-                
-                # 2. Handle Tool Calls Loop
-                while part.function_call:
-                    fc = part.function_call
-                    tool_name = fc.name
-                    args = dict(fc.args)
-                    
-                    # Log for UI
-                    current_tool_log = {
-                        "name": tool_name,
-                        "args": args,
-                        "result": "Pending..."
-                    }
-                    
-                    try:
-                        # Call MCP Tool
-                        result = await session.call_tool(tool_name, arguments=args)
-                        
-                        # Format output
-                        tool_output = ""
-                        if result.isError:
-                            tool_output = f"Error: {result.content}"
-                        else:
-                            text_content = []
-                            for content in result.content:
-                                if content.type == 'text':
-                                    text_content.append(content.text)
-                            tool_output = "\n".join(text_content)
-                        
-                        current_tool_log["result"] = tool_output
-                        tools_used_log.append(current_tool_log)
-
-                        # Send back to Gemini
-                        response = await chat.send_message_async(
-                            genai.protos.Content(
-                                parts=[genai.protos.Part(
-                                    function_response=genai.protos.FunctionResponse(
-                                        name=tool_name,
-                                        response={'result': tool_output}
-                                    )
-                                )]
-                            )
+def get_function_calls(response):
+    """All function calls the model asked for in this turn (it may request several at once)."""
+    return [part.function_call for part in response.candidates[0].content.parts if part.function_call]
+
+async def call_mcp_tool(session, tool_name, args):
+    """Call an MCP tool and format its output as text."""
+    result = await session.call_tool(tool_name, arguments=args)
+    
+    if result.isError:
+        return f"Error: {result.content}"
+    
+    text_content = []
+    for content in result.content:
+        if content.type == 'text':
+            text_content.append(content.text)
+    return "\n".join(text_content)
+
+class MCPBackground:
+    """
+    One event loop, MCP session and Gemini model shared by every Streamlit rerun.
+
+    Streamlit reruns the whole script for each message, so the loop runs in a
+    background thread and the session and model live on it; each message only
+    submits a coroutine to the loop. The session is opened on first use and
+    reopened after a failure.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        threading.Thread(target=self.loop.run_forever, name="mcp-loop", daemon=True).start()
+        self.session = None
+        self.model = None
+        self.tool_count = 0
+        self._closed = None
+        self._lock = asyncio.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on the background loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _hold(self, ready):
+        # The transport's context managers must be entered and exited in the same task
+        try:
+            async with streamable_http_client(SERVER_URL) as (read, write, _):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self._closed = asyncio.Event()
+                    ready.set_result(session)
+                    await self._closed.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+        finally:
+            self.session = None
+
+    async def connect(self):
+        async with self._lock:
+            if self.session is not None:
+                return self.session
+
+            ready = self.loop.create_future()
+            task = self.loop.create_task(self._hold(ready))
+            try:
+                session = await asyncio.wait_for(ready, CONNECT_TIMEOUT)
+            except BaseException:
+                task.cancel()
+                raise
+
+            # List tools and prepare the Gemini model once per connection
+            tools_result = await session.list_tools()
+            gemini_tools = []
+            for tool in tools_result.tools:
+                gemini_tools.append({
+                    "name": tool.name,
+                    "description": tool.description,
+                    "parameters": tool.inputSchema
+                })
+            self.tool_count = len(gemini_tools)
+            self.model = genai.GenerativeModel(
+                model_name='gemini-flash-latest',
+                tools=gemini_tools
+            )
+            return session
+
+    async def reset(self):
+        """Drop the current session so the next message reconnects."""
+        async with self._lock:
+            if self._closed is not None:
+                self._closed.set()
+            self.session = None
+
+@st.cache_resource
+def get_background():
+    return MCPBackground()
+
+async def run_interaction(background, user_query):
+    session = await background.connect()
+    chat = background.model.start_chat(enable_automatic_function_calling=True)
+
+    # 1. Send initial message
+    response = await chat.send_message_async(user_query)
+    function_calls = get_function_calls(response)
+
+    tools_used_log = []
+
+    # 2. Handle Tool Calls Loop (all calls of a turn run concurrently)
+    while function_calls:
+        # Log for UI
+        current_tool_logs = [
+            {
+                "name": fc.name,
+                "args": dict(fc.args),
+                "result": "Pending..."
+            }
+            for fc in function_calls
+        ]
+
+        # Call MCP Tools
+        tool_outputs = await asyncio.gather(
+            *(call_mcp_tool(session, log["name"], log["args"]) for log in current_tool_logs),
+            return_exceptions=True
+        )
+
+        failed = False
+        for current_tool_log, tool_output in zip(current_tool_logs, tool_outputs):
+            if isinstance(tool_output, Exception):
+                current_tool_log["result"] = f"Error executing tool: {str(tool_output)}"
+                failed = True
+            else:
+                current_tool_log["result"] = tool_output
+            tools_used_log.append(current_tool_log)
+
+        if failed:
+            # The session may be broken; reconnect on the next message
+            await background.reset()
+            break
+
+        # Send all results back to Gemini in one message
+        response = await chat.send_message_async(
+            genai.protos.Content(
+                parts=[
+                    genai.protos.Part(
+                        function_response=genai.protos.FunctionResponse(
+                            name=current_tool_log["name"],
+                            response={'result': current_tool_log["result"]}
                         )
-                        part = response.candidates[0].content.parts[0]
-                        
-                    except Exception as e:
-                        current_tool_log["result"] = f"Error executing tool: {str(e)}"
-                        tools_used_log.append(current_tool_log)
-                        break
-
-                # 3. Final Response
-                return response.text, tools_used_log
-                
+                    )
+                    for current_tool_log in current_tool_logs
+                ]
+            )
+        )
+        function_calls = get_function_calls(response)
+
+    # 3. Final Response
+    return response.text, tools_used_log
+
+def handle_message(user_query):
+    background = get_background()
+    try:
+        return background.run(run_interaction(background, user_query))
     except Exception as e:
+        background.run(background.reset())
         return f"Error: {str(e)}", []
 
+background = get_background()
+if background.session is not None:
+    status_placeholder.success(f"Connected! Available Tools: {background.tool_count}")
+else:
+    try:
+        background.run(background.connect())
+        status_placeholder.success(f"Connected! Available Tools: {background.tool_count}")
+    except Exception as e:
+        status_placeholder.error(f"Could not connect to {SERVER_URL}: {e}")
+
 if user_input:
     # Add user message
     st.session_state.messages.append({"role": "user", "content": user_input})
@@ -155,7 +244,7 @@ if user_input:
     # Generate response
     with st.chat_message("assistant"):
         with st.spinner("Talking to Gemini & MCP Server..."):
-            response_text, tools_logs = asyncio.run(run_interaction(user_input))
+            response_text, tools_logs = handle_message(user_input)
             
             # Show tools inline for this new message
             if tools_logs:
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import os
 from mcp import ClientSession
@@ -9,10 +10,17 @@ load_dotenv()
 # Server URL
 SERVER_URL = "http://localhost:8001/sse"
 
-async def test_run():
-    print(f"Connecting to {SERVER_URL}...")
+def open_transport(in_process):
+    if in_process:
+        # Full MCP path (initialize, list_tools, call_tool) with no network
+        from server.inprocess import inprocess_client
+        return inprocess_client()
+    return sse_client(SERVER_URL)
+
+async def test_run(in_process=False):
+    print("Starting in-process server..." if in_process else f"Connecting to {SERVER_URL}...")
     try:
-        async with sse_client(SERVER_URL) as (read, write):
+        async with open_transport(in_process) as (read, write):
             async with ClientSession(read, write) as session:
                 await session.initialize()
                 
@@ -28,4 +36,6 @@ async def test_run():
         print(f"Test failed: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(test_run())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--in-process", action="store_true", help="run the server in this process instead of connecting to it")
+    asyncio.run(test_run(parser.parse_args().in_process))
@@ -0,0 +1,230 @@
+import os
+import re
+import time
+import random
+import asyncio
+import hashlib
+import google.generativeai as genai
+
+# Deterministic stand-ins for the upstream services, for offline load tests.
+#
+# Each upstream has a latency distribution and an error rate, read from
+# FAKE_<NAME>_LATENCY and FAKE_<NAME>_ERROR_RATE. Latency specs are
+#   fixed:MS              always MS milliseconds
+#   uniform:LO:HI         uniformly between LO and HI milliseconds
+#   lognormal:MEDIAN:SIG  log-normal with the given median (ms) and sigma
+# All randomness comes from generators seeded with FAKE_SEED, so a run is
+# repeatable.
+
+FAKE_SEED = int(os.getenv("FAKE_SEED", "42"))
+
+DEFAULT_LATENCY = {
+    "weather": "lognormal:80:0.3",
+    "amadeus": "lognormal:300:0.4",
+    "pinecone": "lognormal:30:0.3",
+    "llm": "lognormal:400:0.3",
+}
+
+def parse_latency(spec):
+    """Return a function that draws a latency in seconds from `rng`."""
+    kind, *values = spec.split(":")
+    values = [float(v) for v in values]
+    if kind == "fixed":
+        return lambda rng: values[0] / 1000
+    if kind == "uniform":
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal":
+        return lambda rng: rng.lognormvariate(0, values[1]) * values[0] / 1000
+    raise ValueError(f"Unknown latency distribution '{spec}'")
+
+
+class FakeUpstream:
+    """Latency and failure behaviour of one fake upstream."""
+
+    def __init__(self, name, latency=None, error_rate=None, seed=FAKE_SEED):
+        self.name = name
+        spec = latency or os.getenv(f"FAKE_{name.upper()}_LATENCY", DEFAULT_LATENCY.get(name, "fixed:0"))
+        self.latency = parse_latency(spec)
+        self.error_rate = error_rate if error_rate is not None else float(os.getenv(f"FAKE_{name.upper()}_ERROR_RATE", "0"))
+        self.rng = random.Random(f"{seed}:{name}")
+
+    def draw(self):
+        """Return (latency in seconds, whether this call fails)."""
+        return self.latency(self.rng), self.rng.random() < self.error_rate
+
+    def wait(self):
+        latency, fails = self.draw()
+        time.sleep(latency)
+        return fails
+
+    async def wait_async(self):
+        latency, fails = self.draw()
+        await asyncio.sleep(latency)
+        return fails
+
+
+def stable_hash(text):
+    return int(hashlib.sha256(text.encode()).hexdigest()[:8], 16)
+
+
+# -- Pinecone --
+
+class FakeMatch:
+    def __init__(self, id, score, metadata):
+        self.id = id
+        self.score = score
+        self.metadata = metadata
+
+
+class FakeQueryResult:
+    def __init__(self, matches):
+        self.matches = matches
+
+
+class FakeIndex:
+    """In-memory stand-in for a Pinecone index (upsert and query only)."""
+
+    def __init__(self, upstream=None):
+        self.upstream = upstream or FakeUpstream("pinecone")
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        if self.upstream.wait():
+            raise RuntimeError("Fake Pinecone: upsert failed")
+        for id, values, metadata in vectors:
+            self.vectors[id] = (values, metadata)
+
+    def query(self, vector, top_k=3, include_metadata=True):
+        if self.upstream.wait():
+            raise RuntimeError("Fake Pinecone: query failed")
+        scored = []
+        # Copied first: tools run in worker threads, so upserts may land mid-query
+        for id, (values, metadata) in list(self.vectors.items()):
+            score = sum(a * b for a, b in zip(vector, values))
+            scored.append(FakeMatch(id, score, metadata if include_metadata else {}))
+        scored.sort(key=lambda match: match.score, reverse=True)
+        return FakeQueryResult(scored[:top_k])
+
+
+# -- Gemini --
+
+class FakeResponse:
+    """Shaped like a GenerateContentResponse: `candidates[0].content.parts` and `text`."""
+
+    def __init__(self, content):
+        self.candidates = [genai.protos.Candidate(content=content)]
+
+    @property
+    def text(self):
+        return "".join(part.text for part in self.candidates[0].content.parts)
+
+
+class FakeStreamResponse:
+    """Async iterable of FakeResponse chunks, like `send_message_async(..., stream=True)`."""
+
+    def __init__(self, content, chunk_delay):
+        self.content = content
+        self.chunk_delay = chunk_delay
+
+    async def __aiter__(self):
+        calls = [part for part in self.content.parts if part.function_call]
+        if calls:
+            yield FakeResponse(genai.protos.Content(role="model", parts=calls))
+            return
+        words = self.content.parts[0].text.split(" ") if self.content.parts else []
+        for i, word in enumerate(words):
+            await asyncio.sleep(self.chunk_delay)
+            text = word if i == 0 else " " + word
+            yield FakeResponse(genai.protos.Content(role="model", parts=[genai.protos.Part(text=text)]))
+
+
+# Requests the fake model turns into tool calls
+WEATHER_PATTERN = re.compile(r"weather in ([A-Za-z .'-]+?)(?=\?|$|,| and )", re.IGNORECASE)
+FLIGHT_PATTERN = re.compile(r"flights? from ([A-Z]{3}) to ([A-Z]{3})(?: (?:on|for) (\d{4}-\d{2}-\d{2}))?", re.IGNORECASE)
+HOTEL_PATTERN = re.compile(r"hotels? in ([A-Z]{3})\b", re.IGNORECASE)
+
+def script_tool_calls(message):
+    """The tool calls the fake model makes for a user message: [(name, args)]."""
+    calls = []
+    for city in WEATHER_PATTERN.findall(message):
+        calls.append(("get_weather", {"city": city.strip()}))
+    for origin, destination, date in FLIGHT_PATTERN.findall(message):
+        calls.append(("search_flights", {
+            "origin": origin.upper(),
+            "destination": destination.upper(),
+            "departure_date": date or "2025-12-25",
+        }))
+    for city_code in HOTEL_PATTERN.findall(message):
+        calls.append(("search_hotels", {"city_code": city_code.upper()}))
+    return calls
+
+
+class FakeChat:
+    """
+    Scripted chat session.
+
+    A user message that mentions weather, flights or hotels gets the matching
+    function calls back (several at once when it asks for several); function
+    responses get a text answer quoting the results; anything else gets a
+    canned text answer.
+    """
+
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = [self._to_content(item) for item in history or []]
+
+    @staticmethod
+    def _to_content(item):
+        if isinstance(item, dict):
+            return genai.protos.Content(role=item["role"], parts=[genai.protos.Part(text=p) for p in item["parts"]])
+        return item
+
+    def _reply(self, message):
+        if isinstance(message, str):
+            self.history.append(genai.protos.Content(role="user", parts=[genai.protos.Part(text=message)]))
+            calls = script_tool_calls(message)
+            if calls:
+                parts = [
+                    genai.protos.Part(function_call=genai.protos.FunctionCall(name=name, args=args))
+                    for name, args in calls
+                ]
+            else:
+                parts = [genai.protos.Part(text=f"This is a scripted answer to: {message}")]
+        else:
+            self.history.append(message)
+            results = [
+                f"{part.function_response.name}: {dict(part.function_response.response).get('result', '')}"
+                for part in message.parts
+            ]
+            parts = [genai.protos.Part(text="Here is what I found. " + " | ".join(results))]
+
+        content = genai.protos.Content(role="model", parts=parts)
+        self.history.append(content)
+        return content
+
+    async def send_message_async(self, message, stream=False):
+        if await self.model.upstream.wait_async():
+            raise RuntimeError("Fake LLM: request failed")
+        content = self._reply(message)
+        if stream:
+            return FakeStreamResponse(content, self.model.chunk_delay)
+        return FakeResponse(content)
+
+
+class FakeGenerativeModel:
+    """Drop-in for `genai.GenerativeModel` backed by FakeChat."""
+
+    def __init__(self, model_name=None, tools=None, upstream=None, chunk_delay=0.005):
+        self.model_name = model_name
+        self.tools = tools
+        self.upstream = upstream or FakeUpstream("llm")
+        self.chunk_delay = chunk_delay
+
+    def start_chat(self, history=None, **kwargs):
+        return FakeChat(self, history)
+
+    async def generate_content_async(self, prompt):
+        if await self.upstream.wait_async():
+            raise RuntimeError("Fake LLM: request failed")
+        # Used for history summaries: keep the tail of the prompt
+        return FakeResponse(genai.protos.Content(role="model", parts=[genai.protos.Part(text=prompt[-400:])]))
@@ -0,0 +1,216 @@
+import argparse
+import asyncio
+import contextlib
+import os
+import random
+import sys
+import tempfile
+import time
+import httpx
+from mcp import ClientSession
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamable_http_client
+from loadtest.util import percentile, start, stop, wait_until_ready
+
+# Offline load test of the MCP server and the web backend's /api/chat.
+#
+# Traffic goes through the real server and backend code; only the upstreams
+# are fake (loadtest/upstreams.py for OpenWeather and Amadeus, in-process fakes
+# for Pinecone and Gemini), so results are repeatable and need no API keys.
+# With --spawn the fake upstreams, the MCP server and the web backend are
+# started with the right environment and stopped afterwards; the fakes'
+# latency and error rates come from FAKE_* variables (see loadtest/fakes.py).
+#
+# Usage:
+#   python -m loadtest.run mcp --spawn --concurrency 32 --duration 20
+#   python -m loadtest.run chat --spawn --concurrency 16 --duration 20
+#   FAKE_AMADEUS_LATENCY=fixed:50 FAKE_WEATHER_ERROR_RATE=0.05 python -m loadtest.run mcp --spawn
+
+UPSTREAMS_PORT = 9100
+SERVER_URL = "http://127.0.0.1:8001"
+WEB_URL = "http://127.0.0.1:8000"
+
+CITIES = ["Tokyo", "Paris", "London", "New York", "Madrid", "Rome", "Berlin", "Lisbon"]
+AIRPORTS = ["PAR", "LON", "NYC", "MAD", "ROM", "BER", "LIS", "TYO"]
+
+def tool_request(rng):
+    """A random (tool, arguments) pair, weighted towards the common tools."""
+    name = rng.choices(
+        ["get_weather", "search_flights", "search_hotels", "store_memory", "retrieve_memory"],
+        weights=[40, 25, 15, 10, 10],
+    )[0]
+    if name == "get_weather":
+        return name, {"city": rng.choice(CITIES)}
+    if name == "search_flights":
+        origin, destination = rng.sample(AIRPORTS, 2)
+        return name, {"origin": origin, "destination": destination, "departure_date": "2025-12-25"}
+    if name == "search_hotels":
+        return name, {"city_code": rng.choice(AIRPORTS)}
+    vector = [rng.random() for _ in range(8)]
+    if name == "store_memory":
+        return name, {"text": f"note {rng.randrange(1000)}", "vector": vector}
+    return name, {"vector": vector, "top_k": 3}
+
+def chat_prompt(rng):
+    """A random chat message the fake model turns into zero, one or several tool calls."""
+    kind = rng.choices(["weather", "two_cities", "flights", "trip", "chat"], weights=[35, 15, 20, 15, 15])[0]
+    if kind == "weather":
+        return f"What is the weather in {rng.choice(CITIES)}?"
+    if kind == "two_cities":
+        first, second = rng.sample(CITIES, 2)
+        return f"What is the weather in {first} and weather in {second}?"
+    origin, destination = rng.sample(AIRPORTS, 2)
+    if kind == "flights":
+        return f"Find flights from {origin} to {destination} on 2025-12-25"
+    if kind == "trip":
+        return f"Find flights from {origin} to {destination} on 2025-12-25 and hotels in {destination}"
+    return "Tell me something interesting about airports."
+
+def report(latencies, errors, elapsed):
+    total = sum(len(samples) for samples in latencies.values())
+    print(f"\n{total} requests in {elapsed:.1f}s: {total / elapsed:.1f} req/s, {sum(errors.values())} errors\n")
+    print(f"{'operation':<18}{'count':>8}{'errors':>8}{'p50':>12}{'p95':>12}{'p99':>12}{'max':>12}")
+    for name in sorted(latencies):
+        samples = latencies[name]
+        row = f"{name:<18}{len(samples):>8}{errors.get(name, 0):>8}"
+        if samples:
+            for pct in (50, 95, 99, 100):
+                row += f"{percentile(samples, pct) * 1000:>10.1f}ms"
+        print(row)
+
+async def run_workers(concurrency, duration, requests, make_worker_call):
+    """
+    Run `concurrency` workers until `duration` seconds pass or `requests` complete.
+
+    `make_worker_call(worker_index)` returns an async callable performing one
+    request and returning (operation name, ok).
+    """
+    latencies = {}
+    errors = {}
+    deadline = time.monotonic() + duration
+    remaining = requests
+
+    async def worker(index):
+        nonlocal remaining
+        call = make_worker_call(index)
+        while time.monotonic() < deadline:
+            if requests:
+                if remaining <= 0:
+                    return
+                remaining -= 1
+            start = time.perf_counter()
+            try:
+                name, ok = await call()
+            except Exception as e:
+                name, ok = "(exception)", False
+                print(f"Request failed: {e}")
+            latencies.setdefault(name, []).append(time.perf_counter() - start)
+            if not ok:
+                errors[name] = errors.get(name, 0) + 1
+
+    started = time.monotonic()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    return latencies, errors, time.monotonic() - started
+
+async def load_mcp(args):
+    transports = {
+        "sse": lambda: sse_client(f"{args.server_url}/sse"),
+        "streamable-http": lambda: streamable_http_client(f"{args.server_url}/mcp/"),
+    }
+    print(f"MCP load test: {args.concurrency} workers over {args.sessions} {args.transport} session(s)")
+
+    async with contextlib.AsyncExitStack() as stack:
+        sessions = []
+        for _ in range(args.sessions):
+            streams = await stack.enter_async_context(transports[args.transport]())
+            session = await stack.enter_async_context(ClientSession(streams[0], streams[1]))
+            await session.initialize()
+            sessions.append(session)
+
+        def make_worker_call(index):
+            rng = random.Random(f"{args.seed}:{index}")
+            session = sessions[index % len(sessions)]
+
+            async def call():
+                name, arguments = tool_request(rng)
+                result = await session.call_tool(name, arguments=arguments)
+                text = "".join(c.text for c in result.content if c.type == "text")
+                return name, not (result.isError or text.startswith("Error"))
+            return call
+
+        return await run_workers(args.concurrency, args.duration, args.requests, make_worker_call)
+
+async def load_chat(args):
+    print(f"Chat load test: {args.concurrency} workers against {args.web_url}/api/chat")
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=120) as client:
+        def make_worker_call(index):
+            rng = random.Random(f"{args.seed}:{index}")
+
+            async def call():
+                response = await client.post(f"{args.web_url}/api/chat", json={"message": chat_prompt(rng)})
+                if response.status_code != 200:
+                    return "chat", False
+                body = response.json()
+                # Label by how many tool calls the exchange made, since that drives its latency
+                name = f"chat ({len(body['tool_calls'])} tools)"
+                return name, not body["response"].startswith("Error")
+            return call
+
+        return await run_workers(args.concurrency, args.duration, args.requests, make_worker_call)
+
+def stack_env(history_db):
+    """Environment pointing the server and backend at the fakes."""
+    env = dict(os.environ)
+    env.update({
+        "OPENWEATHER_BASE_URL": f"http://127.0.0.1:{UPSTREAMS_PORT}/data/2.5/weather",
+        "OPENWEATHER_API_KEY": "fake",
+        "AMADEUS_HOST": "127.0.0.1",
+        "AMADEUS_PORT": str(UPSTREAMS_PORT),
+        "AMADEUS_SSL": "false",
+        "AMADEUS_API_KEY": "fake",
+        "AMADEUS_API_SECRET": "fake",
+        "MEMORY_BACKEND": "fake",
+        "LLM_BACKEND": "fake",
+        "GOOGLE_API_KEY": "fake",
+        "HISTORY_DB_PATH": history_db,
+    })
+    return env
+
+async def spawn_stack(target, history_db):
+    env = stack_env(history_db)
+    processes = [start([sys.executable, "-m", "loadtest.upstreams", "--port", str(UPSTREAMS_PORT)], env)]
+    await wait_until_ready(f"http://127.0.0.1:{UPSTREAMS_PORT}/data/2.5/weather")
+    processes.append(start([sys.executable, "serve.py", "server", "--host", "127.0.0.1"], env))
+    await wait_until_ready(f"{SERVER_URL}/stats")
+    if target == "chat":
+        processes.append(start([sys.executable, "serve.py", "web", "--host", "127.0.0.1"], env))
+        await wait_until_ready(f"{WEB_URL}/api/stats")
+    return processes
+
+async def run(args):
+    processes = []
+    with tempfile.TemporaryDirectory() as tmp:
+        try:
+            if args.spawn:
+                processes = await spawn_stack(args.target, os.path.join(tmp, "history.db"))
+            load = load_mcp if args.target == "mcp" else load_chat
+            latencies, errors, elapsed = await load(args)
+        finally:
+            for process in reversed(processes):
+                stop(process)
+    report(latencies, errors, elapsed)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of the MCP server or the chat API.")
+    parser.add_argument("target", choices=["mcp", "chat"])
+    parser.add_argument("--spawn", action="store_true", help="start fake upstreams, server (and backend) for the run")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run for")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0: run for --duration)")
+    parser.add_argument("--sessions", type=int, default=4, help="MCP sessions shared by the workers (mcp target)")
+    parser.add_argument("--transport", choices=["sse", "streamable-http"], default="sse")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--server-url", default=SERVER_URL)
+    parser.add_argument("--web-url", default=WEB_URL)
+    asyncio.run(run(parser.parse_args()))
@@ -0,0 +1,108 @@
+import argparse
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from loadtest.fakes import FakeUpstream, stable_hash
+
+# Fake OpenWeather and Amadeus HTTP APIs, serving deterministic data with the
+# latency and error rate configured for each upstream (see loadtest/fakes.py).
+#
+# Point the MCP server at it with:
+#   OPENWEATHER_BASE_URL=http://127.0.0.1:9100/data/2.5/weather OPENWEATHER_API_KEY=fake
+#   AMADEUS_HOST=127.0.0.1 AMADEUS_PORT=9100 AMADEUS_SSL=false AMADEUS_API_KEY=fake AMADEUS_API_SECRET=fake
+#
+# Usage:
+#   python -m loadtest.upstreams --port 9100
+
+CONDITIONS = ["clear sky", "few clouds", "broken clouds", "light rain", "overcast clouds", "mist"]
+CARRIERS = ["AF", "BA", "LH", "KL", "IB", "AZ"]
+HOTELS_PER_CITY = 30
+HOTELS_PAGE_SIZE = 10
+
+weather = FakeUpstream("weather")
+amadeus = FakeUpstream("amadeus")
+
+async def failure(upstream):
+    """Wait out the upstream's latency; return an error response if this call fails."""
+    if await upstream.wait_async():
+        return JSONResponse({"errors": [{"status": 500, "title": f"Fake {upstream.name} failure"}]}, status_code=500)
+    return None
+
+async def get_weather(request):
+    error = await failure(weather)
+    if error:
+        return error
+    city = request.query_params.get("q", "")
+    seed = stable_hash(city.lower())
+    return JSONResponse({
+        "name": city,
+        "weather": [{"description": CONDITIONS[seed % len(CONDITIONS)]}],
+        "main": {"temp": round(-5 + seed % 3500 / 100, 2), "humidity": 30 + seed % 60},
+    })
+
+async def amadeus_token(request):
+    error = await failure(amadeus)
+    if error:
+        return error
+    return JSONResponse({"access_token": "fake-token", "token_type": "Bearer", "expires_in": 1799})
+
+async def flight_offers(request):
+    error = await failure(amadeus)
+    if error:
+        return error
+    origin = request.query_params.get("originLocationCode", "")
+    destination = request.query_params.get("destinationLocationCode", "")
+    departure = request.query_params.get("departureDate", "")
+    limit = int(request.query_params.get("max", "3"))
+    seed = stable_hash(f"{origin}{destination}{departure}")
+
+    offers = []
+    for i in range(limit):
+        carrier = CARRIERS[(seed + i) % len(CARRIERS)]
+        stops = (seed >> i) % 2
+        offers.append({
+            "type": "flight-offer",
+            "id": str(i + 1),
+            "price": {"total": f"{80 + (seed >> (2 * i)) % 400}.{(seed + i) % 100:02d}", "currency": "EUR"},
+            "itineraries": [{
+                "segments": [
+                    {"carrierCode": carrier, "number": str(100 + (seed + 7 * (i + s)) % 900)}
+                    for s in range(stops + 1)
+                ]
+            }],
+        })
+    return JSONResponse({"meta": {"count": len(offers)}, "data": offers})
+
+async def hotels_by_city(request):
+    error = await failure(amadeus)
+    if error:
+        return error
+    city_code = request.query_params.get("cityCode", "")
+    seed = stable_hash(city_code)
+    hotels = [
+        {"name": f"{city_code} Hotel {n}", "hotelId": f"{city_code[:2]}{seed % 1000:03d}{n:03d}", "iataCode": city_code}
+        for n in range(1, HOTELS_PER_CITY + 1)
+    ]
+    # Paged like other Amadeus list endpoints: the SDK's amadeus.next() follows meta.links.next
+    offset = int(request.query_params.get("page[offset]", "0"))
+    page = hotels[offset:offset + HOTELS_PAGE_SIZE]
+    meta = {"count": len(hotels)}
+    if offset + HOTELS_PAGE_SIZE < len(hotels):
+        meta["links"] = {"next": f"{request.url.path}?cityCode={city_code}&page%5Boffset%5D={offset + HOTELS_PAGE_SIZE}"}
+    return JSONResponse({"meta": meta, "data": page})
+
+app = Starlette(routes=[
+    Route("/data/2.5/weather", get_weather),
+    Route("/v1/security/oauth2/token", amadeus_token, methods=["POST"]),
+    Route("/v2/shopping/flight-offers", flight_offers),
+    Route("/v1/reference-data/locations/hotels/by-city", hotels_by_city),
+])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve fake OpenWeather and Amadeus APIs.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,38 @@
+import os
+import time
+import signal
+import asyncio
+import subprocess
+import httpx
+
+# Helpers shared by the load test runner, the benchmarks and the batch client.
+# Kept to the standard library and httpx, so importing them doesn't pull in
+# the MCP client or the fakes.
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def start(command, env=None):
+    # New process group so children (a reloader's worker, gunicorn's workers) are stopped as well
+    return subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True)
+
+def stop(process):
+    os.killpg(process.pid, signal.SIGINT)
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+async def wait_until_ready(url, timeout=30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.25)
+    raise RuntimeError(f"Service at {url} did not come up within {timeout}s")
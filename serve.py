@@ -0,0 +1,131 @@
+import argparse
+import importlib.util
+import os
+import uvicorn
+from uvicorn.importer import import_from_string
+
+# Production launcher for the MCP server and the web backend.
+#
+# The `__main__` blocks in server/app.py and web_client/backend/main.py are dev
+# launchers (single worker, file watcher). This one runs several workers, picks
+# the fastest event loop / HTTP parser available and imports the app once in
+# the master process before the workers are forked.
+#
+# Usage:
+#   python serve.py server            # MCP server on :8001
+#   python serve.py web --workers 4   # Web backend on :8000
+
+SERVICES = {
+    # SSE sessions live in the worker that accepted the GET stream, and the
+    # client's message POSTs may land on any worker, so the MCP server defaults
+    # to one worker. Raise --workers only behind a sticky load balancer or when
+    # clients use the stateless /mcp/ endpoint exclusively.
+    "server": {"app": "server.app:app", "port": 8001, "scale_with_cores": False},
+    "web": {"app": "web_client.backend.main:app", "port": 8000, "scale_with_cores": True},
+}
+
+def is_installed(module):
+    return importlib.util.find_spec(module) is not None
+
+def default_workers():
+    # One async worker per usable core (respects container CPU affinity)
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+    return max(1, cores)
+
+def run_gunicorn(app, args):
+    """Fork workers from a master that already imported the app (copy-on-write sharing)."""
+    from gunicorn.app.base import BaseApplication
+
+    if is_installed("uvicorn_worker"):
+        from uvicorn_worker import UvicornWorker
+    else:
+        from uvicorn.workers import UvicornWorker
+
+    class Worker(UvicornWorker):
+        # The worker builds its uvicorn Config from CONFIG_KWARGS plus a few
+        # gunicorn settings (keepalive, backlog, max_requests); anything else,
+        # like the concurrency limit, has to be passed here
+        CONFIG_KWARGS = {
+            "loop": "uvloop" if is_installed("uvloop") else "asyncio",
+            "http": "httptools" if is_installed("httptools") else "h11",
+            "limit_concurrency": args.limit_concurrency,
+        }
+
+    class Application(BaseApplication):
+        def load_config(self):
+            options = {
+                "bind": f"{args.host}:{args.port}",
+                "workers": args.workers,
+                "worker_class": Worker,
+                "preload_app": True,
+                "keepalive": args.keep_alive,
+                "backlog": args.backlog,
+                "graceful_timeout": args.graceful_timeout,
+                "accesslog": "-" if args.access_log else None,
+            }
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return app
+
+    Application().run()
+
+def run_uvicorn(app_path, args):
+    """Fallback when gunicorn is not installed: uvicorn's own process manager."""
+    uvicorn.run(
+        app_path,
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        loop="uvloop" if is_installed("uvloop") else "asyncio",
+        http="httptools" if is_installed("httptools") else "h11",
+        timeout_keep_alive=args.keep_alive,
+        backlog=args.backlog,
+        limit_concurrency=args.limit_concurrency,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        access_log=args.access_log,
+        reload=False,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a service with production settings.")
+    parser.add_argument("service", choices=SERVICES.keys())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, help="Defaults to the service's usual port")
+    parser.add_argument("--workers", type=int, help="Defaults to the core count (web) or 1 (server)")
+    parser.add_argument("--keep-alive", type=int, default=5, help="Idle keep-alive timeout in seconds")
+    parser.add_argument("--backlog", type=int, default=2048, help="Listen socket backlog")
+    parser.add_argument("--limit-concurrency", type=int, default=1000, help="Max concurrent connections per worker")
+    parser.add_argument("--graceful-timeout", type=int, default=30)
+    parser.add_argument("--access-log", action="store_true")
+    args = parser.parse_args()
+
+    service = SERVICES[args.service]
+    args.port = args.port or service["port"]
+    if args.workers is None:
+        args.workers = default_workers() if service["scale_with_cores"] else 1
+
+    # Import the app (and with it the tool clients, env config and model setup)
+    # before any worker exists. Under gunicorn the workers are forked from this
+    # process and share that state; uvicorn spawns fresh interpreters instead,
+    # so there it only surfaces import errors before the workers start.
+    app = import_from_string(service["app"])
+
+    print(
+        f"Starting {args.service} on {args.host}:{args.port} with {args.workers} worker(s) "
+        f"[loop={'uvloop' if is_installed('uvloop') else 'asyncio'}, "
+        f"http={'httptools' if is_installed('httptools') else 'h11'}, "
+        f"manager={'gunicorn' if is_installed('gunicorn') else 'uvicorn'}]"
+    )
+
+    if is_installed("gunicorn"):
+        run_gunicorn(app, args)
+    else:
+        run_uvicorn(service["app"], args)
+
+if __name__ == "__main__":
+    main()
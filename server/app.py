@@ -1,23 +1,37 @@
+import os
 import uvicorn
 from mcp.server.sse import SseServerTransport
+from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
 from mcp.server import Server
 from mcp.types import Tool, TextContent, EmbeddedResource, ImageContent
 import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager
 from starlette.applications import Starlette
+from starlette.responses import JSONResponse, Response
 from starlette.routing import Mount, Route
 
 # Import tools
 from server.tools.weather import get_weather
 from server.tools.travel import search_flights, search_hotels
 from server.tools.memory import store_memory, retrieve_memory
+from server.tools.locations import resolve_location
+from server.sessions import SessionRegistry
+
+# Debug tracebacks are opt-in; production runs go through serve.py
+DEBUG = os.getenv("MCP_DEBUG", "false").lower() == "true"
+# Worker threads for tool calls. Tools spend their time waiting on upstream
+# APIs, so this is sized for concurrent calls rather than for cores.
+TOOL_THREADS = int(os.getenv("MCP_TOOL_THREADS", "32"))
 
 # Initialize MCP Server
 mcp_server = Server("Distributed GenAI Server")
 
 # -- Register Tools Handlers --
 
-async def handle_list_tools(params):
+async def handle_list_tools(params=None):
     return [
         Tool(
             name="get_weather",
@@ -30,26 +44,42 @@ async def handle_list_tools(params):
         ),
         Tool(
             name="search_flights",
-            description="Search for flights between two cities.",
+            description="Search for flights between two cities, given as city names or IATA codes.",
             inputSchema={
                 "type": "object",
                 "properties": {
-                    "origin": {"type": "string"},
-                    "destination": {"type": "string"},
-                    "departure_date": {"type": "string", "description": "YYYY-MM-DD"}
+                    "origin": {"type": "string", "description": "City name or IATA code"},
+                    "destination": {"type": "string", "description": "City name or IATA code"},
+                    "departure_date": {"type": "string", "description": "YYYY-MM-DD"},
+                    "flexible_days": {"type": "integer", "description": "Also search up to this many days (max 3) before and after the date"}
                 },
                 "required": ["origin", "destination", "departure_date"]
             }
         ),
         Tool(
             name="search_hotels",
-            description="Search for hotels in a specific city.",
+            description="Search for hotels in a specific city, given as a city name or IATA code.",
             inputSchema={
                 "type": "object",
-                "properties": {"city_code": {"type": "string"}},
+                "properties": {
+                    "city_code": {"type": "string", "description": "City name or IATA code"},
+                    "limit": {"type": "integer", "description": "Maximum number of hotels (default 5, max 50)"}
+                },
                 "required": ["city_code"]
             }
         ),
+        Tool(
+            name="resolve_location",
+            description="Look up IATA city and airport codes by name (partial or misspelled names work). Fast and offline.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "query": {"type": "string"},
+                    "limit": {"type": "integer"}
+                },
+                "required": ["query"]
+            }
+        ),
         Tool(
             name="store_memory",
             description="Store a text memory with its vector embedding.",
@@ -76,55 +106,114 @@ async def handle_list_tools(params):
         )
     ]
 
+class ToolCancelled(Exception):
+    """Raised inside a tool's thread to stop it once its request was cancelled."""
+
+
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+
+def run_tool(func, *args, **kwargs):
+    return asyncio.get_running_loop().run_in_executor(tool_executor, functools.partial(func, *args, **kwargs))
+
+def progress_reporter(loop, cancelled):
+    """
+    Build the `progress(done, total, message)` callback handed to slow tools.
+
+    The tools run in worker threads, so each update is sent on the event loop
+    as an MCP progress notification, if the client asked for them with a
+    progress token, and the thread waits for it to go out so updates arrive
+    in order and before the final result. Once the client cancels the
+    request, the next update stops the tool instead.
+    """
+    ctx = mcp_server.request_context
+    token = ctx.meta.progressToken if ctx.meta else None
+
+    def report(done, total, message=None):
+        if cancelled.is_set():
+            raise ToolCancelled()
+        if token is None:
+            return
+        asyncio.run_coroutine_threadsafe(
+            ctx.session.send_progress_notification(token, done, total, message, related_request_id=ctx.request_id),
+            loop,
+        ).result()
+
+    return report
+
 async def handle_call_tool(name, arguments):
     print(f"Executing tool: {name} with args: {arguments}")
+    # Tools block on upstream APIs, so each call runs on `tool_executor` and
+    # concurrent calls no longer queue behind each other on the event loop
+    cancelled = threading.Event()
+    progress = progress_reporter(asyncio.get_running_loop(), cancelled)
     try:
         if name == "get_weather":
-            result = get_weather(arguments["city"])
+            result = await run_tool(get_weather, arguments["city"])
             return [TextContent(type="text", text=result)]
             
         elif name == "search_flights":
-            result = search_flights(
+            result = await run_tool(
+                search_flights,
                 arguments.get("origin"), 
                 arguments.get("destination"), 
-                arguments.get("departure_date")
+                arguments.get("departure_date"),
+                arguments.get("flexible_days", 0),
+                progress=progress,
             )
             return [TextContent(type="text", text=result)]
             
         elif name == "search_hotels":
-            result = search_hotels(arguments["city_code"])
+            result = await run_tool(search_hotels, arguments["city_code"], arguments.get("limit", 5), progress=progress)
+            return [TextContent(type="text", text=result)]
+            
+        elif name == "resolve_location":
+            result = resolve_location(arguments["query"], arguments.get("limit", 5))
             return [TextContent(type="text", text=result)]
             
         elif name == "store_memory":
-            result = store_memory(arguments["text"], arguments["vector"])
+            result = await run_tool(store_memory, arguments["text"], arguments["vector"])
             return [TextContent(type="text", text=result)]
             
         elif name == "retrieve_memory":
             top_k = arguments.get("top_k", 3)
-            result = retrieve_memory(arguments["vector"], top_k)
+            result = await run_tool(retrieve_memory, arguments["vector"], top_k)
             return [TextContent(type="text", text=result)]
             
         return []
     except Exception as e:
         print(f"Error executing tool {name}: {e}")
         return [TextContent(type="text", text=f"Error: {e}")]
+    finally:
+        # Stops a tool still running in its thread after the request was cancelled
+        cancelled.set()
 
 # Register handlers to the MCP server instance
-mcp_server.list_tools_handler = handle_list_tools
-mcp_server.call_tool_handler = handle_call_tool
+mcp_server.list_tools()(handle_list_tools)
+mcp_server.call_tool()(handle_call_tool)
 
 # -- Starlette App Setup --
 
 sse = SseServerTransport("messages")
+session_registry = SessionRegistry()
 
 async def handle_sse(scope, receive, send):
     """ASGI Handler for SSE connection"""
-    async with sse.connect_sse(scope, receive, send) as streams:
-        await mcp_server.run(
-            streams[0], 
-            streams[1], 
-            mcp_server.create_initialization_options()
-        )
+    session = session_registry.open()
+    if session is None:
+        response = Response("Too many active sessions", status_code=503, headers={"Retry-After": "5"})
+        await response(scope, receive, send)
+        return
+
+    try:
+        async with sse.connect_sse(scope, receive, send) as streams:
+            async with session_registry.supervise(session, streams[0], streams[1]) as (read, write):
+                await mcp_server.run(
+                    read,
+                    write,
+                    mcp_server.create_initialization_options()
+                )
+    finally:
+        session_registry.close(session)
 
 async def handle_messages(scope, receive, send):
     """ASGI Handler for Message POSTs"""
@@ -138,9 +227,29 @@ async def dispatcher(scope, receive, send):
         print("DEBUG: Dispatching to handle_sse")
         await handle_sse(scope, receive, send)
 
-app = Starlette(debug=True, routes=[
+# Streamable HTTP transport: every client message is a single POST whose
+# response carries the result, so short-lived clients don't hold a stream open.
+# Stateless mode means any request can be served without a prior session.
+streamable_http = StreamableHTTPSessionManager(app=mcp_server, stateless=True)
+
+async def handle_streamable_http(scope, receive, send):
+    """ASGI Handler for Streamable HTTP requests"""
+    await streamable_http.handle_request(scope, receive, send)
+
+async def stats(request):
+    """Live and reaped SSE session counts"""
+    return JSONResponse({"sse": session_registry.stats()})
+
+@asynccontextmanager
+async def lifespan(app):
+    async with streamable_http.run():
+        yield
+
+app = Starlette(debug=DEBUG, routes=[
+    Route("/stats", endpoint=stats),
     Mount("/sse", app=dispatcher),
-])
+    Mount("/mcp", app=handle_streamable_http),
+], lifespan=lifespan)
 
 if __name__ == "__main__":
     uvicorn.run("server.app:app", host="0.0.0.0", port=8001, reload=True)
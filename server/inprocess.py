@@ -0,0 +1,23 @@
+import anyio
+from contextlib import asynccontextmanager
+from mcp.shared.memory import create_client_server_memory_streams
+
+from server.app import mcp_server
+
+@asynccontextmanager
+async def inprocess_client():
+    """
+    Run `mcp_server` in this process and yield (read, write) streams connected to it.
+
+    A drop-in replacement for `sse_client(url)` when the client and server are
+    colocated: messages go over in-memory streams, with no HTTP, no JSON
+    encoding and no session limits, but through the same MCP handlers.
+    """
+    async with create_client_server_memory_streams() as (client_streams, server_streams):
+        server_read, server_write = server_streams
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(lambda: mcp_server.run(server_read, server_write, mcp_server.create_initialization_options()))
+            try:
+                yield client_streams
+            finally:
+                tg.cancel_scope.cancel()
@@ -0,0 +1,199 @@
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+import anyio
+from mcp.shared.message import SessionMessage
+from mcp.types import ErrorData, JSONRPCError, JSONRPCMessage, JSONRPCNotification, JSONRPCRequest, JSONRPCResponse
+
+# Limits for long-lived SSE sessions (overridable via environment variables)
+MAX_SESSIONS = int(os.getenv("MCP_MAX_SESSIONS", "100"))
+SESSION_IDLE_TIMEOUT = float(os.getenv("MCP_SESSION_IDLE_TIMEOUT", "300"))
+HEARTBEAT_INTERVAL = float(os.getenv("MCP_HEARTBEAT_INTERVAL", "30"))
+MAX_OUTSTANDING_REQUESTS = int(os.getenv("MCP_MAX_OUTSTANDING_REQUESTS", "16"))
+MAX_SESSION_BYTES = int(os.getenv("MCP_MAX_SESSION_BYTES", str(1024 * 1024)))
+
+# JSON-RPC error code returned when a session exceeds its request caps
+SESSION_LIMIT_EXCEEDED = -32001
+
+
+class TrackedSession:
+    """Bookkeeping for one live SSE session."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.created_at = time.monotonic()
+        self.last_activity = self.created_at
+        # In-flight client requests: { request_id: payload size in bytes }
+        self.outstanding = {}
+        self.heartbeat_id = None
+        self.heartbeats_sent = 0
+        self.cancel_scope = None
+
+    @property
+    def buffered_bytes(self):
+        return sum(self.outstanding.values())
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+
+class SessionRegistry:
+    """
+    Tracks live SSE sessions and reaps the ones whose client has gone away.
+
+    Each session is supervised by a watchdog that sends an MCP ping every
+    heartbeat interval. A ping still unanswered at the next tick, or a session
+    with no client traffic for longer than the idle timeout, gets its task group
+    cancelled so the server side streams and tasks are released.
+    """
+
+    def __init__(
+        self,
+        max_sessions=MAX_SESSIONS,
+        idle_timeout=SESSION_IDLE_TIMEOUT,
+        heartbeat_interval=HEARTBEAT_INTERVAL,
+        max_outstanding_requests=MAX_OUTSTANDING_REQUESTS,
+        max_session_bytes=MAX_SESSION_BYTES,
+    ):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.heartbeat_interval = heartbeat_interval
+        self.max_outstanding_requests = max_outstanding_requests
+        self.max_session_bytes = max_session_bytes
+
+        self.sessions = {}
+        self.opened_total = 0
+        self.rejected_total = 0
+        self.reaped_total = 0
+        self.reaped_by_reason = {}
+
+    def open(self):
+        """Register a new session, or return None when the registry is full."""
+        if len(self.sessions) >= self.max_sessions:
+            self.rejected_total += 1
+            return None
+
+        session = TrackedSession()
+        self.sessions[session.id] = session
+        self.opened_total += 1
+        return session
+
+    def close(self, session):
+        self.sessions.pop(session.id, None)
+
+    def stats(self):
+        return {
+            "live_sessions": len(self.sessions),
+            "max_sessions": self.max_sessions,
+            "opened_total": self.opened_total,
+            "rejected_total": self.rejected_total,
+            "reaped_total": self.reaped_total,
+            "reaped_by_reason": dict(self.reaped_by_reason),
+            "outstanding_requests": sum(len(s.outstanding) for s in self.sessions.values()),
+        }
+
+    @asynccontextmanager
+    async def supervise(self, session, read_stream, write_stream):
+        """
+        Interpose on a transport's streams for the lifetime of a session.
+
+        Yields the (read, write) stream pair to hand to `mcp_server.run`.
+        """
+        server_read_writer, server_read = anyio.create_memory_object_stream(0)
+        server_write, server_write_reader = anyio.create_memory_object_stream(0)
+
+        try:
+            async with anyio.create_task_group() as tg:
+                session.cancel_scope = tg.cancel_scope
+                tg.start_soon(self._pump_inbound, session, read_stream, server_read_writer, write_stream)
+                tg.start_soon(self._pump_outbound, session, server_write_reader, write_stream)
+                tg.start_soon(self._watchdog, session, write_stream)
+                try:
+                    yield server_read, server_write
+                finally:
+                    tg.cancel_scope.cancel()
+        finally:
+            # Closing the transport's write stream ends its SSE response, so
+            # the HTTP connection is released even if the client never hangs up.
+            await write_stream.aclose()
+            await read_stream.aclose()
+
+    def _reap(self, session, reason):
+        print(f"Reaping session {session.id}: {reason}")
+        self.reaped_total += 1
+        self.reaped_by_reason[reason] = self.reaped_by_reason.get(reason, 0) + 1
+        session.cancel_scope.cancel()
+
+    def _admit(self, session, request, size):
+        """Return an error response for the request if it would exceed the session caps."""
+        if len(session.outstanding) >= self.max_outstanding_requests:
+            message = f"Too many outstanding requests (limit {self.max_outstanding_requests})"
+        elif session.buffered_bytes + size > self.max_session_bytes:
+            message = f"Session request buffer full (limit {self.max_session_bytes} bytes)"
+        else:
+            session.outstanding[request.id] = size
+            return None
+
+        error = JSONRPCError(
+            jsonrpc="2.0",
+            id=request.id,
+            error=ErrorData(code=SESSION_LIMIT_EXCEEDED, message=message),
+        )
+        return SessionMessage(JSONRPCMessage(error))
+
+    async def _pump_inbound(self, session, read_stream, server_read_writer, write_stream):
+        async with server_read_writer:
+            async for message in read_stream:
+                if isinstance(message, SessionMessage):
+                    root = message.message.root
+
+                    # Heartbeat replies are consumed here; the server never sent them
+                    if isinstance(root, (JSONRPCResponse, JSONRPCError)) and root.id == session.heartbeat_id:
+                        session.heartbeat_id = None
+                        continue
+
+                    session.touch()
+
+                    if isinstance(root, JSONRPCRequest):
+                        size = len(message.message.model_dump_json(by_alias=True, exclude_none=True))
+                        rejection = self._admit(session, root, size)
+                        if rejection:
+                            await write_stream.send(rejection)
+                            continue
+                    elif isinstance(root, JSONRPCNotification) and root.method == "notifications/cancelled":
+                        session.outstanding.pop((root.params or {}).get("requestId"), None)
+
+                await server_read_writer.send(message)
+
+    async def _pump_outbound(self, session, server_write_reader, write_stream):
+        async with server_write_reader:
+            async for message in server_write_reader:
+                root = message.message.root
+                if isinstance(root, (JSONRPCResponse, JSONRPCError)):
+                    session.outstanding.pop(root.id, None)
+                await write_stream.send(message)
+
+    async def _watchdog(self, session, write_stream):
+        while True:
+            await anyio.sleep(self.heartbeat_interval)
+
+            if session.heartbeat_id is not None:
+                self._reap(session, "heartbeat_timeout")
+                return
+
+            idle_for = time.monotonic() - session.last_activity
+            if not session.outstanding and idle_for > self.idle_timeout:
+                self._reap(session, "idle_timeout")
+                return
+
+            session.heartbeats_sent += 1
+            session.heartbeat_id = f"heartbeat-{session.heartbeats_sent}"
+            ping = JSONRPCRequest(jsonrpc="2.0", id=session.heartbeat_id, method="ping")
+
+            # A client that stopped reading blocks the unbuffered stream
+            with anyio.move_on_after(self.heartbeat_interval) as scope:
+                await write_stream.send(SessionMessage(JSONRPCMessage(ping)))
+            if scope.cancelled_caught:
+                self._reap(session, "heartbeat_timeout")
+                return
@@ -0,0 +1,153 @@
+import os
+import csv
+import difflib
+import unicodedata
+from server.tools.output import render
+
+# Bundled city and airport list (IATA codes), resolved locally with no upstream call
+LOCATIONS_PATH = os.path.join(os.path.dirname(__file__), "data", "locations.csv")
+FUZZY_CUTOFF = 0.75
+# Stricter similarity for resolving a misspelled name without asking
+RESOLVE_CUTOFF = 0.85
+
+def normalize(text):
+    """Casefold and strip accents and punctuation: "Zürich" and "zurich." both become "zurich"."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join("".join(c if c.isalnum() else " " for c in text).split())
+
+
+class LocationIndex:
+    """
+    Prefix trie over the normalized names and aliases of every location.
+
+    Each trie node is a dict of child characters; the "$" key holds the
+    indexes of locations whose name ends there. Exact code lookups go through
+    a plain dict, and misspellings fall back to difflib over the name list.
+    """
+
+    def __init__(self, rows):
+        self.locations = rows
+        self.by_code = {row["code"]: row for row in rows}
+        self.names = {}
+        self.trie = {}
+        for i, row in enumerate(rows):
+            aliases = [a for a in row["aliases"].split(";") if a]
+            for name in [row["name"]] + aliases:
+                key = normalize(name)
+                self.names.setdefault(key, []).append(i)
+                node = self.trie
+                for char in key:
+                    node = node.setdefault(char, {})
+                node.setdefault("$", []).append(i)
+
+    @classmethod
+    def load(cls, path=LOCATIONS_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def _under(self, node, limit):
+        """Location indexes at or below a trie node, nearest names first."""
+        found = []
+        level = [node]
+        while level and len(found) < limit:
+            next_level = []
+            for current in level:
+                for key, child in sorted(current.items()):
+                    if key == "$":
+                        found.extend(i for i in child if i not in found)
+                    else:
+                        next_level.append(child)
+            level = next_level
+        return found[:limit]
+
+    def search(self, query, limit=5):
+        """Return matching locations, best first: exact code, exact name, name prefix, then fuzzy."""
+        key = normalize(query)
+        if not key:
+            return []
+
+        matches = []
+        code_match = self.by_code.get(query.strip().upper())
+
+        node = self.trie
+        for char in key:
+            node = node.get(char)
+            if node is None:
+                break
+        if node is not None:
+            # Exact name matches come first in the "$" list of the node itself
+            matches.extend(self.locations[i] for i in self._under(node, limit))
+        else:
+            for name in difflib.get_close_matches(key, self.names, n=limit, cutoff=FUZZY_CUTOFF):
+                matches.extend(self.locations[i] for i in self.names[name])
+
+        # Prefer cities over their airports when the name matches both
+        matches.sort(key=lambda row: row["kind"] != "city")
+        unique = [code_match] if code_match else []
+        for row in matches:
+            if row not in unique:
+                unique.append(row)
+        return unique[:limit]
+
+    def _unambiguous(self, indexes):
+        """The one location a set of name matches stands for, or None if they name different places."""
+        rows = [self.locations[i] for i in dict.fromkeys(indexes)]
+        if len({row["city_code"] for row in rows}) != 1:
+            return None
+        # A city and its airports: the city covers them all
+        return next((row for row in rows if row["kind"] == "city"), rows[0]) if len(rows) > 1 else rows[0]
+
+    def resolve_code(self, value, city=False):
+        """
+        IATA code for a city name or code, as (code, candidates).
+
+        Only a code written in capitals, an exact name or alias, or a single
+        close spelling resolves; capitalized codes not in the bundled list are
+        passed through unchanged.
+        Otherwise the code is None and `candidates` holds the best matches,
+        if any, so the caller can ask instead of guessing. With `city=True`,
+        airport codes are mapped to their city code.
+        """
+        code = value.strip().upper()
+        # Written like a code ("ROM", not "Rom" or "rom", which read as names)
+        is_code = len(code) == 3 and code.isalpha() and value.strip() == code
+        row = self.by_code.get(code) if is_code else None
+        if row is None:
+            if is_code:
+                return code, []
+            key = normalize(value)
+            if key in self.names:
+                row = self._unambiguous(self.names[key])
+            else:
+                close = difflib.get_close_matches(key, self.names, n=2, cutoff=RESOLVE_CUTOFF)
+                # A prefix ("Pari", "Rom") is a partial name, not a misspelling
+                if len(close) == 1 and not close[0].startswith(key):
+                    row = self._unambiguous(self.names[close[0]])
+            if row is None:
+                return None, self.search(value)
+        return (row["city_code"] if city else row["code"]), []
+
+
+index = LocationIndex.load()
+
+def resolve_location(query: str, limit: int = 5) -> str:
+    """
+    Find IATA codes for a city or airport name, without calling any API.
+
+    Args:
+        query: City or airport name, possibly partial or misspelled, or an IATA code.
+        limit: Maximum number of matches to return.
+    """
+    results = index.search(query, limit)
+    if not results:
+        return f"No location found for '{query}'."
+
+    return render(
+        ["code", "name", "country", "kind", "city_code"],
+        [(r["code"], r["name"], r["country"], r["kind"], r["city_code"]) for r in results],
+        [
+            f"{r['code']}: {r['name']}, {r['country']} ({r['kind']}" + (f" in {r['city_code']})" if r["kind"] == "airport" else ")")
+            for r in results
+        ],
+    )
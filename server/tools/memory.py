@@ -1,17 +1,25 @@
 import os
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
+from server.tools.output import render
 
 load_dotenv()
 
 PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
+# "pinecone", or "fake" for the in-memory index used by offline load tests
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "pinecone")
 
 pc = None
 index = None
 
 def init_pinecone():
     global pc, index
+    if MEMORY_BACKEND == "fake":
+        from loadtest.fakes import FakeIndex
+        index = FakeIndex()
+        return True
+
     if not PINECONE_API_KEY:
         return False
     
@@ -68,10 +76,12 @@ def retrieve_memory(vector: list[float], top_k: int = 3) -> str:
     try:
         results = index.query(vector=vector, top_k=top_k, include_metadata=True)
         
+        rows = []
         memories = []
         for match in results.matches:
+            rows.append((match.metadata['text'], round(match.score, 3)))
             memories.append(f"- {match.metadata['text']} (Score: {match.score})")
             
-        return "\n".join(memories) if memories else "No relevant memories found."
+        return render(["text", "score"], rows, memories) if memories else "No relevant memories found."
     except Exception as e:
         return f"Error retrieving memory: {e}"
@@ -0,0 +1,49 @@
+import os
+import json
+
+# "text": one English line per result (the original format).
+# "compact": a JSON array whose first row names the columns, e.g.
+#   [["name","id"],["Hotel A","H1"],["Hotel B","H2"]]
+# which drops the per-line labels and, with the field limits below, bounds the
+# prompt tokens a result costs once it is fed back to the model.
+TOOL_OUTPUT_FORMAT = os.getenv("TOOL_OUTPUT_FORMAT", "text")
+
+# Longest string kept per field in compact output, overridable per field with
+# TOOL_OUTPUT_FIELD_LIMITS="name=24,text=120"
+DEFAULT_FIELD_LIMIT = int(os.getenv("TOOL_OUTPUT_MAX_FIELD_CHARS", "80"))
+
+def parse_field_limits(spec):
+    """Parse "field=limit,..." into a dict, skipping (and reporting) malformed entries."""
+    limits = {}
+    for item in filter(None, (item.strip() for item in spec.split(","))):
+        field, _, limit = item.partition("=")
+        field = field.strip()
+        if not field or not limit.strip().isdigit():
+            print(f"Ignoring malformed TOOL_OUTPUT_FIELD_LIMITS entry '{item}' (expected field=limit)")
+            continue
+        limits[field] = int(limit)
+    return limits
+
+FIELD_LIMITS = parse_field_limits(os.getenv("TOOL_OUTPUT_FIELD_LIMITS", ""))
+
+def _cell(column, value):
+    if isinstance(value, str):
+        limit = FIELD_LIMITS.get(column, DEFAULT_FIELD_LIMIT)
+        if limit <= 0:
+            return ""
+        if len(value) > limit:
+            # The ellipsis counts towards the limit, so a limit of 1 leaves just "…"
+            return value[:limit - 1] + "…"
+    return value
+
+def render(columns, rows, text_lines):
+    """
+    Format a tool result.
+
+    `rows` are tuples in `columns` order and `text_lines` the same results as
+    English lines; which one is returned depends on TOOL_OUTPUT_FORMAT.
+    """
+    if TOOL_OUTPUT_FORMAT != "compact":
+        return "\n".join(text_lines)
+    table = [columns] + [[_cell(column, value) for column, value in zip(columns, row)] for row in rows]
+    return json.dumps(table, ensure_ascii=False, separators=(",", ":"))
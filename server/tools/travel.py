@@ -1,82 +1,160 @@
 import os
+from datetime import date, timedelta
 from amadeus import Client, ResponseError
 from dotenv import load_dotenv
+from server.tools.output import render
+from server.tools.locations import index as locations
 
 load_dotenv()
 
 AMADEUS_API_KEY = os.getenv("AMADEUS_API_KEY")
 AMADEUS_API_SECRET = os.getenv("AMADEUS_API_SECRET")
+# Optional API endpoint override (e.g. the fake server in loadtest/upstreams.py)
+AMADEUS_HOST = os.getenv("AMADEUS_HOST")
+AMADEUS_PORT = int(os.getenv("AMADEUS_PORT", "443"))
+AMADEUS_SSL = os.getenv("AMADEUS_SSL", "true").lower() == "true"
+
+# Upper bounds on how much one call may fetch: dates searched either side of
+# the departure date, and hotels listed
+MAX_FLEXIBLE_DAYS = 3
+MAX_HOTELS = 50
+
+# Slow tools accept an optional `progress(done, total, message)` callback and
+# call it as each date or page of results arrives, with those results as the
+# message. It runs in the tool's thread and may raise to stop the search.
 
 def get_amadeus_client():
     if not AMADEUS_API_KEY or not AMADEUS_API_SECRET:
         return None
-    return Client(client_id=AMADEUS_API_KEY, client_secret=AMADEUS_API_SECRET)
+    options = {}
+    if AMADEUS_HOST:
+        options = {"host": AMADEUS_HOST, "port": AMADEUS_PORT, "ssl": AMADEUS_SSL}
+    return Client(client_id=AMADEUS_API_KEY, client_secret=AMADEUS_API_SECRET, **options)
 
-def search_flights(origin: str, destination: str, departure_date: str) -> str:
+def unknown_location(value, candidates):
+    """Error for a name that did not resolve to one place, listing what it might mean."""
+    message = f"Error: Unknown location '{value}'."
+    if candidates:
+        message += " Did you mean: " + ", ".join(f"{r['code']} ({r['name']}, {r['country']})" for r in candidates) + "?"
+    return message + " Use resolve_location to find its IATA code."
+
+def search_flights(origin: str, destination: str, departure_date: str, flexible_days: int = 0, progress=None) -> str:
     """
     Search for flights between two cities on a specific date.
     
     Args:
-        origin: IATA code of the origin city (e.g., NYC).
-        destination: IATA code of the destination city (e.g., LON).
+        origin: City name or IATA code of the origin (e.g., New York or NYC).
+        destination: City name or IATA code of the destination (e.g., London or LON).
         departure_date: Date of departure in YYYY-MM-DD format.
+        flexible_days: Also search this many days before and after the departure date.
     """
     amadeus = get_amadeus_client()
     if not amadeus:
         return "Error: Amadeus API credentials not found."
 
+    # Resolve city names locally rather than letting Amadeus reject them
+    origin_code, candidates = locations.resolve_code(origin)
+    if not origin_code:
+        return unknown_location(origin, candidates)
+    destination_code, candidates = locations.resolve_code(destination)
+    if not destination_code:
+        return unknown_location(destination, candidates)
+
+    flexible_days = max(0, min(int(flexible_days), MAX_FLEXIBLE_DAYS))
+    dates = [departure_date]
+    if flexible_days:
+        try:
+            start = date.fromisoformat(departure_date)
+        except ValueError:
+            return f"Error: Invalid departure date '{departure_date}', expected YYYY-MM-DD."
+        dates = [(start + timedelta(days=d)).isoformat() for d in range(-flexible_days, flexible_days + 1)]
+
+    # The date column is only worth its tokens when several dates were searched
+    columns = ["date", "flights", "price", "currency"] if flexible_days else ["flights", "price", "currency"]
+    rows = []
+    results = []
     try:
-        response = amadeus.shopping.flight_offers_search.get(
-            originLocationCode=origin,
-            destinationLocationCode=destination,
-            departureDate=departure_date,
-            adults=1,
-            max=3
-        )
-        
-        offers = response.data
-        if not offers:
-            return "No flights found."
+        for i, day in enumerate(dates):
+            response = amadeus.shopping.flight_offers_search.get(
+                originLocationCode=origin_code,
+                destinationLocationCode=destination_code,
+                departureDate=day,
+                adults=1,
+                max=3
+            )
             
-        results = []
-        for offer in offers:
-            price = offer['price']['total']
-            currency = offer['price']['currency']
-            itineraries = offer['itineraries'][0]['segments']
-            flight_info = " -> ".join([f"{s['carrierCode']}{s['number']}" for s in itineraries])
-            results.append(f"Flight: {flight_info}, Price: {price} {currency}")
+            day_rows = []
+            day_results = []
+            for offer in response.data:
+                price = offer['price']['total']
+                currency = offer['price']['currency']
+                itineraries = offer['itineraries'][0]['segments']
+                flights = [f"{s['carrierCode']}{s['number']}" for s in itineraries]
+                if flexible_days:
+                    day_rows.append((day, ">".join(flights), price, currency))
+                    day_results.append(f"Flight on {day}: {' -> '.join(flights)}, Price: {price} {currency}")
+                else:
+                    day_rows.append((">".join(flights), price, currency))
+                    day_results.append(f"Flight: {' -> '.join(flights)}, Price: {price} {currency}")
+            rows.extend(day_rows)
+            results.extend(day_results)
+
+            if progress:
+                progress(i + 1, len(dates), render(columns, day_rows, day_results) if day_rows else f"No flights on {day}.")
+
+        if not rows:
+            return "No flights found."
             
-        return "\n".join(results)
+        return render(columns, rows, results)
         
     except ResponseError as error:
         return f"Error searching flights: {error}"
 
-def search_hotels(city_code: str) -> str:
+def search_hotels(city_code: str, limit: int = 5, progress=None) -> str:
     """
     Search for hotels in a specific city.
     
     Args:
-        city_code: IATA code of the city (e.g., LON).
+        city_code: City name or IATA code of the city (e.g., London or LON).
+        limit: Maximum number of hotels to list.
     """
     amadeus = get_amadeus_client()
     if not amadeus:
         return "Error: Amadeus API credentials not found."
 
+    # Hotel search wants a city code, so airport codes map to their city
+    resolved, candidates = locations.resolve_code(city_code, city=True)
+    if not resolved:
+        return unknown_location(city_code, candidates)
+    city_code = resolved
+    limit = max(1, min(int(limit), MAX_HOTELS))
+
     try:
-        # First get hotel ids for the city
+        # Get hotel ids for the city, following the API's pages until we have enough
         response = amadeus.reference_data.locations.hotels.by_city.get(cityCode=city_code)
-        hotels = response.data[:5] # Limit to 5
+        rows = []
+        results = []
+        while response is not None:
+            page_rows = []
+            page_results = []
+            for hotel in response.data[:limit - len(rows)]:
+                name = hotel.get('name', 'Unknown')
+                hotel_id = hotel.get('hotelId', 'Unknown')
+                page_rows.append((name, hotel_id))
+                page_results.append(f"Hotel: {name} (ID: {hotel_id})")
+            rows.extend(page_rows)
+            results.extend(page_results)
+
+            if progress and page_rows:
+                progress(len(rows), limit, render(["name", "id"], page_rows, page_results))
+            if len(rows) >= limit:
+                break
+            response = amadeus.next(response)
         
-        if not hotels:
+        if not rows:
             return f"No hotels found in {city_code}."
             
-        results = []
-        for hotel in hotels:
-            name = hotel.get('name', 'Unknown')
-            hotel_id = hotel.get('hotelId', 'Unknown')
-            results.append(f"Hotel: {name} (ID: {hotel_id})")
-            
-        return "\n".join(results)
+        return render(["name", "id"], rows, results)
         
     except ResponseError as error:
         return f"Error searching hotels: {error}"
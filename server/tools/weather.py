@@ -1,11 +1,12 @@
 import os
 import requests
 from dotenv import load_dotenv
+from server.tools.output import render
 
 load_dotenv()
 
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY")
-BASE_URL = "http://api.openweathermap.org/data/2.5/weather"
+BASE_URL = os.getenv("OPENWEATHER_BASE_URL", "http://api.openweathermap.org/data/2.5/weather")
 
 def get_weather(city: str) -> str:
     """
@@ -32,7 +33,11 @@ def get_weather(city: str) -> str:
         temp = data["main"]["temp"]
         humidity = data["main"]["humidity"]
         
-        return f"Weather in {city}: {weather_desc}, Temperature: {temp}°C, Humidity: {humidity}%"
+        return render(
+            ["city", "weather", "temp_c", "humidity"],
+            [(city, weather_desc, temp, humidity)],
+            [f"Weather in {city}: {weather_desc}, Temperature: {temp}°C, Humidity: {humidity}%"],
+        )
     except requests.exceptions.RequestException as e:
         return f"Error fetching weather data: {str(e)}"
     except KeyError:
@@ -0,0 +1,100 @@
+import os
+import time
+from collections import OrderedDict
+from web_client.backend.context import estimate_tokens
+
+# Bounds for cached Gemini chat sessions
+CHAT_CACHE_MAX_SESSIONS = int(os.getenv("CHAT_CACHE_MAX_SESSIONS", "256"))
+CHAT_CACHE_MAX_TOKENS = int(os.getenv("CHAT_CACHE_MAX_TOKENS", "1000000"))
+CHAT_CACHE_IDLE_TTL = float(os.getenv("CHAT_CACHE_IDLE_TTL", "900"))
+
+def estimate_chat_tokens(chat):
+    """Approximate size of a chat's history, including function call/response turns."""
+    total = 0
+    for content in chat.history:
+        for part in content.parts:
+            total += estimate_tokens(part.text if part.text else str(part))
+    return total
+
+
+class ChatSessionCache:
+    """
+    LRU of live Gemini chat sessions, one per conversation.
+
+    A chat is checked out for the duration of a request and checked back in
+    when the request succeeds, so two concurrent requests for the same
+    conversation never share a ChatSession (the second one misses and
+    rebuilds). Entries are also dropped when idle for longer than the TTL, and
+    the least recently used ones are evicted to stay within the session and
+    estimated-token bounds.
+    """
+
+    def __init__(self, max_sessions=CHAT_CACHE_MAX_SESSIONS, max_tokens=CHAT_CACHE_MAX_TOKENS, idle_ttl=CHAT_CACHE_IDLE_TTL):
+        self.max_sessions = max_sessions
+        self.max_tokens = max_tokens
+        self.idle_ttl = idle_ttl
+        # { session_id: {"chat", "message_count", "tokens", "last_used"} }, least recently used first
+        self._entries = OrderedDict()
+        self._tokens = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def checkout(self, session_id, message_count):
+        """
+        Take the cached chat for a conversation, or None on a miss.
+
+        `message_count` is the number of stored history messages; a cached chat
+        built from a different count is stale (the history changed elsewhere).
+        """
+        entry = self._entries.pop(session_id, None)
+        if entry is not None:
+            self._tokens -= entry["tokens"]
+            if time.monotonic() - entry["last_used"] > self.idle_ttl:
+                self.expirations += 1
+                entry = None
+            elif entry["message_count"] != message_count:
+                entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry["chat"]
+
+    def checkin(self, session_id, chat, message_count, tokens):
+        self._entries[session_id] = {
+            "chat": chat,
+            "message_count": message_count,
+            "tokens": tokens,
+            "last_used": time.monotonic(),
+        }
+        self._tokens += tokens
+        self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._entries:
+            session_id, entry = next(iter(self._entries.items()))
+            if now - entry["last_used"] > self.idle_ttl:
+                self.expirations += 1
+            elif len(self._entries) > self.max_sessions or self._tokens > self.max_tokens:
+                self.evictions += 1
+            else:
+                break
+            del self._entries[session_id]
+            self._tokens -= entry["tokens"]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "sessions": len(self._entries),
+            "estimated_tokens": self._tokens,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
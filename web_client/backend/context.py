@@ -0,0 +1,120 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Token budget for the history sent to Gemini with each request
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "4000"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("HISTORY_SUMMARY_TOKEN_BUDGET", "400"))
+# Bounds for the per-session summaries kept in memory
+SUMMARY_MAX_SESSIONS = int(os.getenv("HISTORY_SUMMARY_MAX_SESSIONS", "1024"))
+SUMMARY_IDLE_TTL = float(os.getenv("HISTORY_SUMMARY_IDLE_TTL", "3600"))
+
+def estimate_tokens(text):
+    # ~4 characters per token is close enough for budgeting English text and
+    # avoids a count_tokens round trip per message.
+    return len(text) // 4 + 1
+
+
+class ContextWindow:
+    """
+    Keeps the conversation history sent to Gemini within a token budget.
+
+    The most recent messages are kept verbatim. Older messages are folded into
+    a running summary per session, which is prepended to the history. The
+    summary is updated incrementally in a background task, so the request that
+    overflows the budget does not wait on the extra model call; until the
+    update lands, the overflowing messages are simply left out.
+
+    Summaries are kept in an LRU bounded like ChatSessionCache: entries idle
+    for longer than the TTL expire, and the least recently used are evicted
+    beyond `max_sessions`. A dropped summary is rebuilt from the history the
+    next time that conversation overflows the budget.
+    """
+
+    def __init__(self, summarize, token_budget=HISTORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET,
+                 max_sessions=SUMMARY_MAX_SESSIONS, idle_ttl=SUMMARY_IDLE_TTL):
+        # summarize(previous_summary, messages, max_tokens) -> new summary text
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        # { session_id: {"text": summary, "covered": number of leading messages folded in, "last_used"} },
+        # least recently used first
+        self.summaries = OrderedDict()
+        self._pending = {}
+
+    def _get_summary(self, session_id):
+        summary = self.summaries.get(session_id)
+        if summary is None:
+            return None
+        if time.monotonic() - summary["last_used"] > self.idle_ttl:
+            del self.summaries[session_id]
+            return None
+        summary["last_used"] = time.monotonic()
+        self.summaries.move_to_end(session_id)
+        return summary
+
+    def _store_summary(self, session_id, text, covered):
+        self.summaries[session_id] = {"text": text, "covered": covered, "last_used": time.monotonic()}
+        self.summaries.move_to_end(session_id)
+        now = time.monotonic()
+        while self.summaries:
+            oldest = next(iter(self.summaries.values()))
+            if len(self.summaries) <= self.max_sessions and now - oldest["last_used"] <= self.idle_ttl:
+                break
+            self.summaries.popitem(last=False)
+
+    def build(self, session_id, history):
+        """Return the history to send, as a list of {role, content} messages."""
+        summary = self._get_summary(session_id)
+        if summary and summary["covered"] > len(history):
+            # History is shorter than what we summarized (e.g. it was reset)
+            self.summaries.pop(session_id, None)
+            summary = None
+
+        covered = summary["covered"] if summary else 0
+        remaining = history[covered:]
+
+        budget = self.token_budget - (estimate_tokens(summary["text"]) if summary else 0)
+        start = len(remaining)
+        used = 0
+        for i in range(len(remaining) - 1, -1, -1):
+            used += estimate_tokens(remaining[i]["content"])
+            if used > budget:
+                break
+            start = i
+
+        # Start the verbatim window on a user turn so roles keep alternating
+        while start < len(remaining) and remaining[start]["role"] != "user":
+            start += 1
+
+        overflow = remaining[:start]
+        if overflow and session_id is not None:
+            self._schedule_summary(session_id, summary, overflow, covered + len(overflow))
+
+        window = []
+        if summary:
+            window.append({"role": "user", "content": f"Summary of our conversation so far: {summary['text']}"})
+            window.append({"role": "assistant", "content": "Understood, I'll keep that in mind."})
+        window.extend(remaining[start:])
+        return window
+
+    def _schedule_summary(self, session_id, summary, overflow, covered):
+        task = self._pending.get(session_id)
+        if task and not task.done():
+            return
+        self._pending[session_id] = asyncio.create_task(self._update_summary(session_id, summary, overflow, covered))
+
+    async def _update_summary(self, session_id, summary, overflow, covered):
+        try:
+            text = await self.summarize(summary["text"] if summary else "", overflow, self.summary_budget)
+            self._store_summary(session_id, text, covered)
+        except Exception as e:
+            logger.warning(f"Failed to summarize history for session {session_id}: {e}")
+        finally:
+            self._pending.pop(session_id, None)
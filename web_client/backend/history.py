@@ -1,36 +1,350 @@
+import os
 import uuid
+import queue
+import sqlite3
+import logging
+import threading
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
+# SQLite database holding all chat sessions; shared by every backend worker
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "chat_history.db")
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", "20"))
+HISTORY_MAX_PAGE_SIZE = 100
+# Most writes committed together by the writer thread in one transaction
+WRITE_BATCH_SIZE = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    last_activity TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    last_message TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_messages_session ON messages (session_id, id);
+CREATE INDEX IF NOT EXISTS idx_sessions_last_activity ON sessions (last_activity, id);
+CREATE TABLE IF NOT EXISTS writer_batches (
+    writer TEXT PRIMARY KEY,
+    seq INTEGER NOT NULL
+);
+"""
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
 class HistoryManager:
-    def __init__(self):
-        # In-memory storage: { session_id: [ {role, content, timestamp} ] }
-        self.sessions = {}
+    """
+    Chat history stored in SQLite (WAL mode).
+
+    Writes go through a queue to a single writer thread, which commits them in
+    batches, so request handlers never wait on disk. Writes that are queued but
+    not yet committed are kept in a small per-session overlay that reads merge
+    in, so a request always sees its own writes. Nothing else is held in
+    memory: sessions and messages are read from the database a page at a time.
+
+    The lock only guards the overlay; commits happen outside it. Each batch is
+    numbered and its number is committed with it (`writer_batches`), so a read
+    that sees the database after a commit but the overlay before its entries
+    were dropped can tell which of them are already in the database.
+
+    The writer thread is started by the first write, in the process making it.
+    The app is imported before gunicorn forks its workers, and threads do not
+    survive a fork, so each worker gets its own writer (and fresh connections).
+    """
+
+    def __init__(self, path=HISTORY_DB_PATH):
+        self.path = path
+        conn = _connect(path)
+        with conn:
+            conn.executescript(SCHEMA)
+        conn.close()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # { session_id: {"new": bool, "new_batch", "created_at", "messages": [...], "batches": [(seq, count)]} }
+        # for uncommitted writes; "new_batch" and "batches" record the batches being committed
+        self._pending = {}
+        self._writer_id = uuid.uuid4().hex
+        self._batch_seq = 0
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def _enqueue(self, op):
+        # Called with self._lock held
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+            self._writer.start()
+        self._queue.put(op)
+
+    def _conn(self):
+        # One read connection per thread; the writer thread has its own
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = _connect(self.path)
+        return conn
 
     def create_session(self):
         session_id = str(uuid.uuid4())
-        self.sessions[session_id] = []
+        created_at = datetime.now().isoformat()
+        with self._lock:
+            self._pending[session_id] = self._overlay(True, created_at)
+            self._enqueue(("session", session_id, created_at))
         return session_id
 
     def add_message(self, session_id, role, content):
-        if session_id not in self.sessions:
-            self.sessions[session_id] = []
-        
-        self.sessions[session_id].append({
-            "role": role,
-            "content": content,
-            "timestamp": datetime.now().isoformat()
-        })
+        message = {"role": role, "content": content, "timestamp": datetime.now().isoformat()}
+        with self._lock:
+            pending = self._pending.get(session_id)
+            if pending is None:
+                pending = self._pending[session_id] = self._overlay(False, message["timestamp"])
+            pending["messages"].append(message)
+            # Queued under the lock so the queue and the overlay stay in the same order
+            self._enqueue(("message", session_id, message))
+
+    @staticmethod
+    def _overlay(new, created_at):
+        return {"new": new, "new_batch": None, "created_at": created_at, "messages": [], "batches": []}
+
+    def _read(self, session_ids=None):
+        """
+        Snapshot the overlay and open a read transaction on this thread's connection.
+
+        Returns (conn, pending), where `pending` maps session ids (all, or
+        `session_ids`) to {"new", "created_at", "messages"} holding only the
+        writes the transaction does not see yet. The caller must end the
+        transaction with `conn.commit()`.
+        """
+        with self._lock:
+            ids = self._pending if session_ids is None else [sid for sid in session_ids if sid in self._pending]
+            snapshot = {
+                sid: {**self._pending[sid], "messages": list(self._pending[sid]["messages"]),
+                      "batches": list(self._pending[sid]["batches"])}
+                for sid in ids
+            }
+        conn = self._conn()
+        conn.execute("BEGIN")
+        row = conn.execute("SELECT seq FROM writer_batches WHERE writer = ?", (self._writer_id,)).fetchone()
+        committed_seq = row["seq"] if row else 0
+
+        pending = {}
+        for sid, p in snapshot.items():
+            done = sum(count for seq, count in p["batches"] if seq <= committed_seq)
+            new = p["new"] and not (p["new_batch"] is not None and p["new_batch"] <= committed_seq)
+            if new or p["messages"][done:]:
+                pending[sid] = {"new": new, "created_at": p["created_at"], "messages": p["messages"][done:]}
+        return conn, pending
 
     def get_history(self, session_id):
-        return self.sessions.get(session_id, [])
-
-    def list_sessions(self):
-        return [
-            {
-                "id": sid, 
-                "message_count": len(msgs), 
-                "last_message": msgs[-1]["content"] if msgs else "",
-                "timestamp": msgs[-1]["timestamp"] if msgs else ""
+        """Return every message of a session, oldest first."""
+        conn, pending = self._read([session_id])
+        try:
+            rows = conn.execute(
+                "SELECT role, content, timestamp FROM messages WHERE session_id = ? ORDER BY id",
+                (session_id,),
+            ).fetchall()
+        finally:
+            conn.commit()
+        pending = pending.get(session_id, {}).get("messages", [])
+        return [dict(row) for row in rows] + pending
+
+    def get_messages(self, session_id, limit=HISTORY_PAGE_SIZE, before=None):
+        """
+        Return a page of a session's messages, oldest first.
+
+        Pages go backwards from the most recent message; pass the returned
+        `next_cursor` as `before` to get the previous page.
+        """
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        conn, pending = self._read([] if before is not None else [session_id])
+        try:
+            pending = pending.get(session_id, {}).get("messages", [])
+            # Uncommitted messages are always the newest; a page may run over the limit to include them all
+            remaining = max(limit - len(pending), 0)
+            query = "SELECT id, role, content, timestamp FROM messages WHERE session_id = ?"
+            params = [session_id]
+            if before is not None:
+                query += " AND id < ?"
+                params.append(before)
+            query += " ORDER BY id DESC LIMIT ?"
+            params.append(remaining + 1)
+            rows = conn.execute(query, params).fetchall()
+
+            has_more = len(rows) > remaining
+            rows = list(reversed(rows[:remaining]))
+            if has_more and not rows:
+                # The whole page was uncommitted messages; continue from the newest committed one
+                next_cursor = conn.execute(
+                    "SELECT MAX(id) + 1 FROM messages WHERE session_id = ?", (session_id,)
+                ).fetchone()[0]
+            else:
+                next_cursor = rows[0]["id"] if has_more else None
+        finally:
+            conn.commit()
+
+        messages = [{"role": r["role"], "content": r["content"], "timestamp": r["timestamp"]} for r in rows]
+        return {"messages": messages + pending, "next_cursor": next_cursor}
+
+    def list_sessions(self, limit=HISTORY_PAGE_SIZE, cursor=None):
+        """
+        Return a page of sessions, most recently active first.
+
+        Pass the returned `next_cursor` as `cursor` to get the next page.
+        Sessions with uncommitted writes are merged in by their latest
+        activity, so they count towards `limit` like any other session.
+        """
+        limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+        after = tuple(cursor.partition("|")[::2]) if cursor else None
+        conn, pending = self._read()
+        try:
+            query = "SELECT * FROM sessions"
+            params = []
+            if after:
+                query += " WHERE (last_activity, id) < (?, ?)"
+                params += list(after)
+            # Rows of sessions with uncommitted writes are replaced below, so fetch enough to fill the page without them
+            query += " ORDER BY last_activity DESC, id DESC LIMIT ?"
+            params.append(limit + 1 + len(pending))
+            rows = conn.execute(query, params).fetchall()
+            committed = {}
+            if pending:
+                placeholders = ",".join("?" * len(pending))
+                for row in conn.execute(f"SELECT * FROM sessions WHERE id IN ({placeholders})", list(pending)):
+                    committed[row["id"]] = dict(row)
+        finally:
+            conn.commit()
+
+        sessions = []
+        for sid, p in pending.items():
+            row = committed.get(sid, {"message_count": 0, "last_message": "", "last_activity": p["created_at"]})
+            session = {
+                "id": sid,
+                "message_count": row["message_count"] + len(p["messages"]),
+                "last_message": p["messages"][-1]["content"] if p["messages"] else row["last_message"],
+                "timestamp": p["messages"][-1]["timestamp"] if p["messages"] else row["last_activity"],
             }
-            for sid, msgs in self.sessions.items()
-        ]
+            if after is None or (session["timestamp"], sid) < after:
+                sessions.append(session)
+
+        for row in rows:
+            if row["id"] in pending:
+                continue
+            sessions.append({
+                "id": row["id"],
+                "message_count": row["message_count"],
+                "last_message": row["last_message"],
+                "timestamp": row["last_activity"],
+            })
+
+        sessions.sort(key=lambda session: (session["timestamp"], session["id"]), reverse=True)
+        next_cursor = None
+        if len(sessions) > limit:
+            sessions = sessions[:limit]
+            next_cursor = f"{sessions[-1]['timestamp']}|{sessions[-1]['id']}"
+        return {"sessions": sessions, "next_cursor": next_cursor}
+
+    def close(self):
+        """Commit all queued writes and stop the writer thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+            if writer is None:
+                return
+            self._queue.put(None)
+        writer.join()
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            while len(batch) < WRITE_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if None in batch:
+                running = False
+                batch = [op for op in batch if op is not None]
+
+            # Number the batch before committing it, so reads can tell its
+            # overlay entries apart once the commit is visible
+            self._batch_seq += 1
+            seq = self._batch_seq
+            counts = {}
+            with self._lock:
+                for kind, session_id, value in batch:
+                    if kind == "session":
+                        self._pending[session_id]["new_batch"] = seq
+                    else:
+                        counts[session_id] = counts.get(session_id, 0) + 1
+                for session_id, count in counts.items():
+                    self._pending[session_id]["batches"].append((seq, count))
+
+            try:
+                with conn:
+                    for op in batch:
+                        self._apply(conn, op)
+                    conn.execute(
+                        "INSERT INTO writer_batches (writer, seq) VALUES (?, ?) "
+                        "ON CONFLICT (writer) DO UPDATE SET seq = excluded.seq",
+                        (self._writer_id, seq),
+                    )
+            except sqlite3.Error as e:
+                logger.error(f"Failed to write {len(batch)} history updates: {e}")
+
+            with self._lock:
+                for kind, session_id, value in batch:
+                    pending = self._pending[session_id]
+                    if kind == "session":
+                        pending["new"] = False
+                        pending["new_batch"] = None
+                for session_id, count in counts.items():
+                    pending = self._pending[session_id]
+                    del pending["messages"][:count]
+                    pending["batches"].pop(0)
+                for session_id in {op[1] for op in batch}:
+                    pending = self._pending[session_id]
+                    if not pending["new"] and not pending["messages"]:
+                        del self._pending[session_id]
+        conn.close()
+
+    def _apply(self, conn, op):
+        kind, session_id, value = op
+        if kind == "session":
+            conn.execute(
+                "INSERT OR IGNORE INTO sessions (id, created_at, last_activity) VALUES (?, ?, ?)",
+                (session_id, value, value),
+            )
+            return
+
+        conn.execute(
+            "INSERT INTO messages (session_id, role, content, timestamp) VALUES (?, ?, ?, ?)",
+            (session_id, value["role"], value["content"], value["timestamp"]),
+        )
+        conn.execute(
+            """
+            INSERT INTO sessions (id, created_at, last_activity, message_count, last_message)
+            VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT (id) DO UPDATE SET
+                last_activity = excluded.last_activity,
+                message_count = message_count + 1,
+                last_message = excluded.last_message
+            """,
+            (session_id, value["timestamp"], value["timestamp"], value["content"]),
+        )
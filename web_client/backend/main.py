@@ -1,11 +1,16 @@
 import uvicorn
 from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
-from web_client.backend.mcp_client import MCPManager
-from web_client.backend.history import HistoryManager
+from sse_starlette import EventSourceResponse
+from web_client.backend.mcp_client import MCPManager, MCPUnavailableError
+from web_client.backend.history import HistoryManager, HISTORY_PAGE_SIZE
+from web_client.backend.semantic_cache import SemanticCache, SEMANTIC_CACHE_ENABLED
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
+import json
+import time
 import logging
 
 # Configure Logging
@@ -15,6 +20,7 @@ logger = logging.getLogger(__name__)
 # Global Managers
 mcp_manager = MCPManager()
 history_manager = HistoryManager()
+semantic_cache = SemanticCache() if SEMANTIC_CACHE_ENABLED else None
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -31,6 +37,7 @@ async def lifespan(app: FastAPI):
     # Shutdown: Disconnect
     logger.info("Disconnecting from MCP Server...")
     await mcp_manager.disconnect()
+    history_manager.close()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -52,25 +59,45 @@ class ChatResponse(BaseModel):
     session_id: str
     tool_calls: List[Dict[str, Any]] = []
 
+async def cache_lookup(message, history):
+    """
+    Look a message up in the semantic cache.
+
+    Returns (vector, result); vector is None when the cache does not apply.
+    Only the first turn of a conversation is cached, since later answers
+    depend on the history that came before them.
+    """
+    if semantic_cache is None or history or mcp_manager.tools_fingerprint is None:
+        return None, None
+    try:
+        vector = await semantic_cache.vector_for(message)
+    except Exception as e:
+        logger.warning(f"Semantic cache lookup failed: {e}")
+        return None, None
+    return vector, semantic_cache.lookup(vector, mcp_manager.tools_fingerprint)
+
+def cache_store(vector, result, started):
+    if vector is None or result["response"].startswith("Error"):
+        return
+    result = {"response": result["response"], "tool_calls": result.get("tool_calls", [])}
+    semantic_cache.store(vector, mcp_manager.tools_fingerprint, result, time.perf_counter() - started)
+
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat_endpoint(request: ChatRequest):
     try:
-        if not mcp_manager.session:
-            logger.warning("MCP Session is None, attempting reconnect...")
-            try:
-                 await mcp_manager.connect()
-            except Exception as reconnect_err:
-                 raise HTTPException(status_code=503, detail=f"MCP Server not connected and reconnect failed: {reconnect_err}")
-            
         # Get history
         session_id = request.session_id
         if not session_id:
              session_id = history_manager.create_session()
              
-        history = history_manager.get_history(session_id)
+        history = await run_in_threadpool(history_manager.get_history, session_id)
         
-        # Call Gemini via MCP Manager
-        result = await mcp_manager.process_message(request.message, history)
+        vector, result = await cache_lookup(request.message, history)
+        if result is None:
+            # Call Gemini via MCP Manager
+            started = time.perf_counter()
+            result = await mcp_manager.process_message(request.message, history, session_id)
+            cache_store(vector, result, started)
         
         # Save interaction
         history_manager.add_message(session_id, "user", request.message)
@@ -82,17 +109,74 @@ async def chat_endpoint(request: ChatRequest):
             tool_calls=result.get("tool_calls", [])
         )
         
+    except MCPUnavailableError as e:
+        logger.warning(f"MCP Server unavailable: {e}")
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing chat: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Server-Sent Events version of /api/chat.
+
+    Emits a `session` event first, then `tool_start` / `tool_progress` /
+    `tool_end` events as MCP tools run (progress events carry partial results)
+    and `token` events as Gemini streams the answer, and finally a
+    `done` event carrying the full response. Failures end the stream with an
+    `error` event.
+    """
+    session_id = request.session_id
+    if not session_id:
+        session_id = history_manager.create_session()
+
+    history = await run_in_threadpool(history_manager.get_history, session_id)
+
+    async def cached_events(result):
+        yield {"type": "token", "text": result["response"]}
+        yield {"type": "done", **result}
+
+    async def event_stream():
+        yield {"event": "session", "data": json.dumps({"type": "session", "session_id": session_id})}
+        try:
+            vector, result = await cache_lookup(request.message, history)
+            if result is not None:
+                events = cached_events(result)
+            else:
+                events = mcp_manager.stream_message(request.message, history, session_id)
+            started = time.perf_counter()
+            async for event in events:
+                if event["type"] == "done":
+                    # Save interaction
+                    history_manager.add_message(session_id, "user", request.message)
+                    history_manager.add_message(session_id, "assistant", event["response"])
+                    if result is None:
+                        cache_store(vector, event, started)
+                yield {"event": event["type"], "data": json.dumps(event)}
+        except Exception as e:
+            logger.error(f"Error streaming chat: {e}")
+            yield {"event": "error", "data": json.dumps({"type": "error", "detail": str(e)})}
+
+    return EventSourceResponse(event_stream())
+
+@app.get("/api/stats")
+async def get_stats():
+    stats = {"chat_cache": mcp_manager.chats.stats()}
+    if semantic_cache is not None:
+        stats["semantic_cache"] = semantic_cache.stats()
+    return stats
+
+# History reads query SQLite, so these run on FastAPI's thread pool
 @app.get("/api/history")
-async def get_all_sessions():
-    return history_manager.list_sessions()
+def get_all_sessions(limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None):
+    """Sessions, most recently active first: {sessions, next_cursor}."""
+    return history_manager.list_sessions(limit, cursor)
 
 @app.get("/api/history/{session_id}")
-async def get_session_history_endpoint(session_id: str):
-    return history_manager.get_history(session_id)
+def get_session_history_endpoint(session_id: str, limit: int = HISTORY_PAGE_SIZE, before: Optional[int] = None):
+    """A page of a session's messages, oldest first: {messages, next_cursor}."""
+    return history_manager.get_messages(session_id, limit, before)
 
 if __name__ == "__main__":
     uvicorn.run("web_client.backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,69 +1,349 @@
 import os
+import json
 import asyncio
+import hashlib
+import itertools
+import httpx
+from datetime import timedelta
 import google.generativeai as genai
-from mcp import ClientSession
+from mcp import ClientSession, types
 from mcp.client.sse import sse_client
+from mcp.shared.exceptions import McpError
 from dotenv import load_dotenv
+from web_client.backend.context import ContextWindow
+from web_client.backend.chat_cache import ChatSessionCache, estimate_chat_tokens
 
 load_dotenv()
 
 SERVER_URL = "http://localhost:8001/sse"
+# "sse" connects to SERVER_URL; "inprocess" runs the MCP server inside this process
+MCP_TRANSPORT = os.getenv("MCP_TRANSPORT", "sse")
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 genai.configure(api_key=GOOGLE_API_KEY)
 
-from contextlib import AsyncExitStack
+# "gemini", or "fake" for the scripted model used by offline load tests
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+if LLM_BACKEND == "fake":
+    from loadtest.fakes import FakeGenerativeModel as GenerativeModel
+else:
+    GenerativeModel = genai.GenerativeModel
 
-# ...
+# Connection pool settings
+POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "3"))
+CONNECT_TIMEOUT = float(os.getenv("MCP_CONNECT_TIMEOUT", "10"))
+TOOL_CALL_TIMEOUT = float(os.getenv("MCP_TOOL_CALL_TIMEOUT", "60"))
+HEALTH_CHECK_INTERVAL = float(os.getenv("MCP_HEALTH_CHECK_INTERVAL", "15"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("MCP_HEALTH_CHECK_TIMEOUT", "5"))
+# Streamed chats end a slow tool call once it has reported this many partial
+# results (flight dates, hotel pages) and answer from those; 0 waits for all
+TOOL_PARTIAL_RESULTS_ENOUGH = int(os.getenv("TOOL_PARTIAL_RESULTS_ENOUGH", "0"))
+RECONNECT_BACKOFF_BASE = 0.5
+RECONNECT_BACKOFF_MAX = 30.0
 
-class MCPManager:
-    def __init__(self):
+
+class MCPUnavailableError(Exception):
+    """Raised when no pooled MCP connection can serve a request."""
+
+
+def open_transport():
+    if MCP_TRANSPORT == "inprocess":
+        # Imported lazily: it loads the server and all of its tools
+        from server.inprocess import inprocess_client
+        return inprocess_client()
+    return sse_client(SERVER_URL)
+
+
+class MCPConnection:
+    """
+    One pooled MCP session.
+
+    The transport and ClientSession are entered and exited by a dedicated
+    task (`_run`), so reconnects triggered from any request never have to
+    unwind anyio cancel scopes that belong to another task.
+    """
+
+    def __init__(self, index):
+        self.index = index
         self.session = None
-        self.exit_stack = None
-        self.model = None
-        self.chat = None
-        self._sse_client = None
+        # Bumped on every successful connect; lets callers tell whether the
+        # session they saw fail has already been replaced.
+        self.generation = 0
+        self.in_flight = 0
+        self.failures = 0
+        self._task = None
+        self._closing = None
+        self._reconnect_task = None
+        self._lock = asyncio.Lock()
 
-    async def connect(self):
-        print(f"Connecting to MCP Server at {SERVER_URL}...")
+    async def _run(self, ready):
         try:
-            self.exit_stack = AsyncExitStack()
-            
-            # Start SSE Client
-            self._sse_client = sse_client(SERVER_URL)
-            read, write = await self.exit_stack.enter_async_context(self._sse_client)
-            
-            # Start Client Session
-            self.session = ClientSession(read, write)
-            await self.exit_stack.enter_async_context(self.session)
-            
-            # Initialize
-            await self.session.initialize()
-            
-            # List Tools and Init Gemini
-            await self._setup_gemini()
-            
-            print("Connected to MCP Server and initialized Gemini.")
-            
+            async with open_transport() as (read, write):
+                async with ClientSession(read, write) as session:
+                    await session.initialize()
+                    self.session = session
+                    self.generation += 1
+                    if not ready.done():
+                        ready.set_result(None)
+                    await self._closing.wait()
         except Exception as e:
-            print(f"Failed to connect to MCP Server: {e}")
-            await self.disconnect()
-            raise e
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"MCP connection {self.index} lost: {e}")
+                self.mark_failed(self.generation)
+        finally:
+            self.session = None
+
+    async def open(self):
+        self._closing = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        self._task = asyncio.create_task(self._run(ready))
+        try:
+            await asyncio.wait_for(ready, CONNECT_TIMEOUT)
+        except BaseException:
+            await self.close()
+            raise
+
+    async def close(self):
+        self.session = None
+        if self._task is None:
+            return
+        self._closing.set()
+        try:
+            await asyncio.wait_for(self._task, 5)
+        except asyncio.TimeoutError:
+            pass  # wait_for has cancelled the stuck transport task
+        self._task = None
+
+    async def reconnect(self, generation):
+        """Replace the session, unless another caller already replaced `generation`."""
+        async with self._lock:
+            if self.session is not None and self.generation != generation:
+                return
+            await self.close()
+            await self.open()
+            self.failures = 0
+            print(f"MCP connection {self.index} re-established.")
+
+    def mark_failed(self, generation):
+        """Take a dead or stalled session out of rotation and reconnect it in the background."""
+        if self.generation != generation:
+            return
+        self.session = None
+        if self._reconnect_task is None or self._reconnect_task.done():
+            self._reconnect_task = asyncio.create_task(self._reconnect_with_backoff(generation))
+
+    async def _reconnect_with_backoff(self, generation):
+        while True:
+            delay = min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_BASE * 2 ** self.failures)
+            await asyncio.sleep(delay)
+            try:
+                await self.reconnect(generation)
+                return
+            except Exception as e:
+                self.failures += 1
+                print(f"MCP connection {self.index} reconnect failed (attempt {self.failures}): {e}")
+
+    async def shutdown(self):
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        await self.close()
+
+
+class MCPManager:
+    def __init__(self, pool_size=POOL_SIZE):
+        self.connections = [MCPConnection(i) for i in range(pool_size)]
+        self.model = None
+        self.summary_model = GenerativeModel(model_name='gemini-1.5-flash')
+        self.context = ContextWindow(self._summarize)
+        self.chats = ChatSessionCache()
+        # Identifies the tool set the model was built with (see SemanticCache)
+        self.tools_fingerprint = None
+        self._rotation = itertools.cycle(range(pool_size))
+        self._health_task = None
+
+    @property
+    def connected(self):
+        return any(c.session is not None for c in self.connections)
+
+    async def connect(self):
+        target = "in-process MCP Server" if MCP_TRANSPORT == "inprocess" else f"MCP Server at {SERVER_URL}"
+        print(f"Connecting to {target} with {len(self.connections)} connections...")
+        results = await asyncio.gather(*(c.open() for c in self.connections), return_exceptions=True)
+
+        for connection, result in zip(self.connections, results):
+            if isinstance(result, BaseException):
+                print(f"MCP connection {connection.index} failed to open: {result}")
+                connection.mark_failed(connection.generation)
+
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+        if not self.connected:
+            raise MCPUnavailableError(f"Could not open any connection to {target}")
+
+        # List Tools and Init Gemini
+        await self._setup_gemini()
+        print("Connected to MCP Server and initialized Gemini.")
 
     async def disconnect(self):
         print("Disconnecting from MCP Server...")
-        if self.session:
-            await self.session.__aexit__(None, None, None)
-            self.session = None
-        
-        if self._sse_client:
-            await self._sse_client.__aexit__(None, None, None)
-            self._sse_client = None
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        await asyncio.gather(*(c.shutdown() for c in self.connections))
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(HEALTH_CHECK_INTERVAL)
+            await asyncio.gather(*(self._check(c) for c in self.connections))
+
+    async def _check(self, connection):
+        session, generation = connection.session, connection.generation
+        if session is None:
+            connection.mark_failed(generation)
+            return
+        try:
+            await asyncio.wait_for(session.send_ping(), HEALTH_CHECK_TIMEOUT)
+        except Exception as e:
+            print(f"MCP connection {connection.index} failed health check: {e!r}")
+            connection.mark_failed(generation)
+
+    async def _acquire(self, failed=None):
+        """
+        Pick the healthy connection with the fewest in-flight calls.
+
+        After a transport failure on `failed`, the other sessions may be just
+        as dead (e.g. the server restarted), so that connection is reconnected
+        inline and used instead.
+        """
+        if failed is not None:
+            connection, generation = failed
+            try:
+                await connection.reconnect(generation)
+            except Exception as e:
+                raise MCPUnavailableError(f"MCP Server connection lost and reconnect failed: {e}")
+            return connection
+
+        start = next(self._rotation)
+        ordered = self.connections[start:] + self.connections[:start]
+        healthy = [c for c in ordered if c.session is not None]
+
+        if not healthy:
+            # Nothing usable: try one serialized reconnect inline before giving up
+            connection = ordered[0]
+            try:
+                await connection.reconnect(connection.generation)
+            except Exception as e:
+                raise MCPUnavailableError(f"MCP Server not connected and reconnect failed: {e}")
+            healthy = [connection]
+
+        return min(healthy, key=lambda c: c.in_flight)
+
+    async def call_tool(self, name, arguments, progress_callback=None):
+        """
+        Call a tool on the least-loaded healthy connection.
+
+        Transport failures (the request never got a response, or the
+        connection closed under it) are retried once, on the same connection
+        after reconnecting it. A timeout is not retried, because the tool may
+        already have run, but the stalled connection is taken out of rotation.
+        Other error responses are raised without touching the connection.
+
+        `progress_callback(progress, total, message)` is awaited for every
+        progress notification the tool sends; the message carries its partial
+        results. When the callback returns True the call is cancelled on the
+        server and the partial results received so far are returned instead.
+        """
+        failed = None
+        for attempt in range(2):
+            connection = await self._acquire(failed)
+            session, generation = connection.session, connection.generation
+            connection.in_flight += 1
+            try:
+                if progress_callback is None:
+                    return await session.call_tool(
+                        name,
+                        arguments=arguments,
+                        read_timeout_seconds=timedelta(seconds=TOOL_CALL_TIMEOUT),
+                    )
+                return await self._call_with_progress(session, name, arguments, progress_callback)
+            except McpError as e:
+                # A timeout means the connection may be stalled and a closed
+                # connection is a transport failure; other error responses
+                # (e.g. the server's per-session backpressure) come from a
+                # healthy connection
+                if e.error.code == httpx.codes.REQUEST_TIMEOUT:
+                    connection.mark_failed(generation)
+                if e.error.code != types.CONNECTION_CLOSED:
+                    raise
+                error = e
+            except Exception as e:
+                error = e
+            finally:
+                connection.in_flight -= 1
+
+            connection.mark_failed(generation)
+            if attempt == 1:
+                raise error
+            print(f"MCP connection {connection.index} failed during {name}, reconnecting: {error!r}")
+            failed = (connection, generation)
+
+    async def _call_with_progress(self, session, name, arguments, progress_callback):
+        partials = []
+        enough = asyncio.Event()
+        request_ids = []
+
+        async def on_progress(progress, total, message):
+            if message:
+                partials.append(message)
+            if await progress_callback(progress, total, message):
+                enough.set()
+
+        async def call():
+            # ClientSession numbers requests from this counter (and uses the
+            # number as the progress token); it is read and bumped with no
+            # await in between, so this is the id of the request sent below
+            request_ids.append(session._request_id)
+            return await session.call_tool(
+                name,
+                arguments=arguments,
+                read_timeout_seconds=timedelta(seconds=TOOL_CALL_TIMEOUT),
+                progress_callback=on_progress,
+            )
+
+        call_task = asyncio.create_task(call())
+        enough_task = asyncio.create_task(enough.wait())
+        try:
+            await asyncio.wait([call_task, enough_task], return_when=asyncio.FIRST_COMPLETED)
+            if call_task.done():
+                return call_task.result()
+        finally:
+            enough_task.cancel()
+            call_task.cancel()
+
+        # Enough partial results: stop the tool on the server, answer with what arrived
+        await session.send_notification(types.ClientNotification(types.CancelledNotification(
+            params=types.CancelledNotificationParams(requestId=request_ids[0], reason="Enough partial results")
+        )))
+        return types.CallToolResult(content=[types.TextContent(type="text", text="\n".join(partials))])
+
+    async def _run_tool(self, tool_name, args, progress_callback=None):
+        """Call an MCP tool and flatten its result to the text handed back to Gemini."""
+        result = await self.call_tool(tool_name, arguments=args, progress_callback=progress_callback)
+
+        # Format Output
+        if result.isError:
+            return f"Error: {result.content}"
+        text_content = [c.text for c in result.content if c.type == 'text']
+        return "\n".join(text_content)
 
     async def _setup_gemini(self):
         # List tools
-        tools_result = await self.session.list_tools()
+        connection = await self._acquire()
+        tools_result = await connection.session.list_tools()
         mcp_tools = tools_result.tools
-        
+
         gemini_tools = []
         for tool in mcp_tools:
             gemini_tools.append({
@@ -71,12 +351,13 @@ class MCPManager:
                 "description": tool.description,
                 "parameters": tool.inputSchema
             })
-            
-        self.model = genai.GenerativeModel(
+
+        self.model = GenerativeModel(
             model_name='gemini-1.5-flash',
             tools=gemini_tools
         )
-        
+        self.tools_fingerprint = hashlib.sha256(json.dumps(gemini_tools, sort_keys=True).encode()).hexdigest()[:16]
+
         # Start a chat session (stateless for the class, but we use it to handle func calling)
         # For a real multi-user web app, we might want to recreate this or manage history differently
         # But for this demo, we can just use a fresh chat or manage history manually.
@@ -84,63 +365,186 @@ class MCPManager:
         # but we will feed in the history.
         pass
 
-    async def process_message(self, user_message: str, history: list):
-        # Reconstruct chat history for Gemini
+    async def _summarize(self, previous_summary, messages, max_tokens):
+        """Fold older messages into the running conversation summary."""
+        transcript = "\n".join(f"{msg['role']}: {msg['content']}" for msg in messages)
+        prompt = (
+            f"Update the running summary of a conversation between a user and an assistant.\n"
+            f"Keep facts, names, places, dates and tool results the user may refer back to. "
+            f"Answer with the updated summary only, in at most {max_tokens * 3 // 4} words.\n\n"
+            f"Current summary:\n{previous_summary or '(none)'}\n\n"
+            f"New messages:\n{transcript}"
+        )
+        response = await self.summary_model.generate_content_async(prompt)
+        return response.text.strip()
+
+    def _format_history(self, history):
         formatted_history = []
         for msg in history:
             role = "user" if msg["role"] == "user" else "model"
             formatted_history.append({"role": role, "parts": [msg["content"]]})
-            
-        chat = self.model.start_chat(history=formatted_history, enable_automatic_function_calling=True)
-        
-        # Standard Gemini Function Calling Loop (Manual)
-        # Wait... with enable_automatic_function_calling=True, we need local functions. 
-        # But we are calling REMOTE functions via MCP.
-        # So we MUST use manual function calling logic, similar to the CLI client.
-        
-        chat = self.model.start_chat(history=formatted_history) # Disable auto
-        
+        return formatted_history
+
+    def _get_chat(self, session_id, history):
+        """Reuse the live chat for this conversation, rebuilding it from history on a miss."""
+        if session_id is not None:
+            chat = self.chats.checkout(session_id, len(history))
+            if chat is not None:
+                return chat
+
+        # Reconstruct chat history for Gemini, trimmed to the token budget.
+        # Function calling is handled manually below: the tools are remote MCP
+        # tools, not local callables, so automatic function calling can't be used.
+        formatted_history = self._format_history(self.context.build(session_id, history))
+        return self.model.start_chat(history=formatted_history)
+
+    def _keep_chat(self, session_id, chat, message_count):
+        """Return a chat to the cache once the exchange (user + assistant message) is stored."""
+        if session_id is None:
+            return
+        tokens = estimate_chat_tokens(chat)
+        # Past the budget, let the next request rebuild it through the context window
+        if tokens <= self.context.token_budget:
+            self.chats.checkin(session_id, chat, message_count, tokens)
+
+    async def process_message(self, user_message: str, history: list, session_id: str = None):
+        if self.model is None:
+            # Startup could not reach the server; build the model on first use
+            await self._setup_gemini()
+
+        chat = self._get_chat(session_id, history)
+
         response = await chat.send_message_async(user_message)
         tool_calls_made = []
-        
+
         # Handle Tool Calls Loop
         while True:
-            part = response.candidates[0].content.parts[0]
-            
-            if not part.function_call:
+            # The model may ask for several tools in one turn; run them all
+            function_calls = [part.function_call for part in response.candidates[0].content.parts if part.function_call]
+
+            if not function_calls:
                 break
-                
-            fc = part.function_call
-            tool_name = fc.name
-            args = dict(fc.args)
-            tool_calls_made.append({"name": tool_name, "args": args})
-            
-            print(f"[Gemini requested tool: {tool_name}]")
-            
+
+            calls = [(fc.name, dict(fc.args)) for fc in function_calls]
+            for tool_name, args in calls:
+                tool_calls_made.append({"name": tool_name, "args": args})
+                print(f"[Gemini requested tool: {tool_name}]")
+
             try:
-                # Call MCP
-                result = await self.session.call_tool(tool_name, arguments=args)
-                
-                # Format Output
-                tool_output = ""
-                if result.isError:
-                    tool_output = f"Error: {result.content}"
-                else:
-                    text_content = [c.text for c in result.content if c.type == 'text']
-                    tool_output = "\n".join(text_content)
-                
-                # feedback to Gemini
+                # Call MCP concurrently, one round trip for the whole turn
+                tool_outputs = await asyncio.gather(*(self._run_tool(name, args) for name, args in calls))
+
+                # feedback to Gemini, every function response in one message
                 response = await chat.send_message_async(
                      genai.protos.Content(
-                        parts=[genai.protos.Part(
-                            function_response=genai.protos.FunctionResponse(
-                                name=tool_name,
-                                response={'result': tool_output}
+                        parts=[
+                            genai.protos.Part(
+                                function_response=genai.protos.FunctionResponse(
+                                    name=tool_name,
+                                    response={'result': tool_output}
+                                )
                             )
-                        )]
+                            for (tool_name, _), tool_output in zip(calls, tool_outputs)
+                        ]
                     )
                 )
             except Exception as e:
                 return {"response": f"Error executing tool: {e}", "tool_calls": tool_calls_made}
 
+        self._keep_chat(session_id, chat, len(history) + 2)
         return {"response": response.text, "tool_calls": tool_calls_made}
+
+    async def stream_message(self, user_message: str, history: list, session_id: str = None):
+        """
+        Streaming variant of `process_message`.
+
+        Yields events as they happen instead of one result at the end:
+          {"type": "tool_start", "id", "name", "args"}  when the model requests a tool
+          {"type": "tool_progress", "id", "name", "progress", "total", "message"}
+                                                        as a slow tool reports partial results
+          {"type": "tool_end", "id", "name", "result"}  as each tool call finishes
+          {"type": "token", "text"}                     for each chunk of model text
+          {"type": "done", "response", "tool_calls"}    once the exchange is complete
+        """
+        if self.model is None:
+            await self._setup_gemini()
+
+        chat = self._get_chat(session_id, history)
+        tool_calls_made = []
+        response_text = []
+        message = user_message
+
+        while True:
+            response = await chat.send_message_async(message, stream=True)
+
+            function_calls = []
+            async for chunk in response:
+                if not chunk.candidates:
+                    continue
+                for part in chunk.candidates[0].content.parts:
+                    if part.function_call:
+                        function_calls.append(part.function_call)
+                    elif part.text:
+                        response_text.append(part.text)
+                        yield {"type": "token", "text": part.text}
+
+            if not function_calls:
+                break
+
+            calls = [(fc.name, dict(fc.args)) for fc in function_calls]
+            for tool_name, args in calls:
+                yield {"type": "tool_start", "id": len(tool_calls_made), "name": tool_name, "args": args}
+                tool_calls_made.append({"name": tool_name, "args": args})
+            first_id = len(tool_calls_made) - len(calls)
+
+            # Run concurrently, reporting progress and each call as soon as it finishes
+            tool_outputs = [None] * len(calls)
+            events = asyncio.Queue()
+
+            async def run_indexed(index, tool_name, args):
+                partials = 0
+
+                async def on_progress(progress, total, message):
+                    nonlocal partials
+                    partials += 1
+                    events.put_nowait({
+                        "type": "tool_progress", "id": first_id + index, "name": tool_name,
+                        "progress": progress, "total": total, "message": message,
+                    })
+                    return 0 < TOOL_PARTIAL_RESULTS_ENOUGH <= partials
+
+                try:
+                    tool_outputs[index] = await self._run_tool(tool_name, args, on_progress)
+                except Exception as e:
+                    events.put_nowait(e)
+                    return
+                events.put_nowait({"type": "tool_end", "id": first_id + index, "name": tool_name, "result": tool_outputs[index]})
+
+            tasks = [asyncio.create_task(run_indexed(i, name, args)) for i, (name, args) in enumerate(calls)]
+            try:
+                pending = len(tasks)
+                while pending:
+                    event = await events.get()
+                    if isinstance(event, Exception):
+                        raise event
+                    if event["type"] == "tool_end":
+                        pending -= 1
+                    yield event
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            message = genai.protos.Content(
+                parts=[
+                    genai.protos.Part(
+                        function_response=genai.protos.FunctionResponse(
+                            name=tool_name,
+                            response={'result': tool_output}
+                        )
+                    )
+                    for (tool_name, _), tool_output in zip(calls, tool_outputs)
+                ]
+            )
+
+        self._keep_chat(session_id, chat, len(history) + 2)
+        yield {"type": "done", "response": "".join(response_text), "tool_calls": tool_calls_made}
@@ -0,0 +1,118 @@
+import os
+import re
+import time
+import numpy as np
+import google.generativeai as genai
+
+# Opt-in: answers are reused across users, so only enable it where that is acceptable
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1000"))
+EMBEDDING_MODEL = "models/text-embedding-004"
+
+# How long an answer stays valid, by the tools that produced it (seconds).
+# An answer expires with the most volatile tool it used; 0 means never cache.
+TOOL_TTLS = {
+    "get_weather": 10 * 60,
+    "search_flights": 15 * 60,
+    "search_hotels": 24 * 60 * 60,
+    "resolve_location": 7 * 24 * 60 * 60,
+    "store_memory": 0,
+    "retrieve_memory": 0,
+}
+DEFAULT_TOOL_TTL = 5 * 60
+NO_TOOL_TTL = 60 * 60
+
+def normalize(message):
+    message = re.sub(r"\s+", " ", message.lower()).strip()
+    return message.strip(" ?!.")
+
+def ttl_for(tools_used):
+    if not tools_used:
+        return NO_TOOL_TTL
+    return min(TOOL_TTLS.get(name, DEFAULT_TOOL_TTL) for name in tools_used)
+
+async def embed(text):
+    result = await genai.embed_content_async(model=EMBEDDING_MODEL, content=text, task_type="semantic_similarity")
+    return result["embedding"]
+
+
+class SemanticCache:
+    """
+    Reuses chat answers for paraphrased questions.
+
+    Entries are keyed on the embedding of the normalized user message and the
+    fingerprint of the tool set the answer was produced with, so answers
+    produced with a different tool set never match. A lookup hits when the
+    cosine similarity to a live entry reaches the threshold. Each entry's TTL
+    comes from the tools that fed the answer (weather expires quickly, hotel
+    lists slowly), and the oldest entries are evicted beyond `max_entries`.
+    """
+
+    def __init__(self, embed=embed, threshold=SEMANTIC_CACHE_THRESHOLD, max_entries=SEMANTIC_CACHE_MAX_ENTRIES):
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.entries = []
+        self._matrix = None
+        self.hits = 0
+        self.misses = 0
+        self.latency_saved = 0.0
+
+    async def vector_for(self, message):
+        vector = np.asarray(await self.embed(normalize(message)), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, vector, fingerprint):
+        """Return the cached result closest to `vector`, or None."""
+        self._expire()
+        if self.entries:
+            if self._matrix is None:
+                self._matrix = np.stack([entry["vector"] for entry in self.entries])
+            scores = self._matrix @ vector
+            for index in np.argsort(scores)[::-1]:
+                if scores[index] < self.threshold:
+                    break
+                entry = self.entries[index]
+                if entry["fingerprint"] == fingerprint:
+                    self.hits += 1
+                    self.latency_saved += entry["latency"]
+                    return entry["result"]
+
+        self.misses += 1
+        return None
+
+    def store(self, vector, fingerprint, result, latency):
+        tools_used = sorted({call["name"] for call in result.get("tool_calls", [])})
+        ttl = ttl_for(tools_used)
+        if ttl <= 0:
+            return
+
+        self.entries.append({
+            "vector": vector,
+            "fingerprint": fingerprint,
+            "result": result,
+            "tools_used": tools_used,
+            "latency": latency,
+            "expires_at": time.monotonic() + ttl,
+        })
+        if len(self.entries) > self.max_entries:
+            del self.entries[: len(self.entries) - self.max_entries]
+        self._matrix = None
+
+    def _expire(self):
+        now = time.monotonic()
+        live = [entry for entry in self.entries if entry["expires_at"] > now]
+        if len(live) != len(self.entries):
+            self.entries = live
+            self._matrix = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "latency_saved_ms": round(self.latency_saved * 1000),
+        }
@@ -6,6 +6,8 @@ const API_BASE = 'http://localhost:8000/api';
 
 function App() {
   const [sessions, setSessions] = useState([]);
+  const [sessionsCursor, setSessionsCursor] = useState(null);
+  const [messagesCursor, setMessagesCursor] = useState(null);
   const [currentSessionId, setCurrentSessionId] = useState(null);
   const [messages, setMessages] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
@@ -21,41 +23,83 @@ function App() {
       loadSession(currentSessionId);
     } else {
       setMessages([]);
+      setMessagesCursor(null);
     }
   }, [currentSessionId]);
 
-  const fetchHistory = async () => {
+  // History is paged: pass a cursor to append the next (older) page
+  const fetchHistory = async (cursor = null) => {
     try {
-      const res = await fetch(`${API_BASE}/history`);
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const res = await fetch(`${API_BASE}/history${query}`);
       if (res.ok) {
         const data = await res.json();
-        setSessions(data);
+        setSessions(prev => cursor ? [...prev, ...data.sessions] : data.sessions);
+        setSessionsCursor(data.next_cursor);
       }
     } catch (err) {
       console.error("Failed to load history", err);
     }
   };
 
-  const loadSession = async (id) => {
+  const loadSession = async (id, before = null) => {
     try {
-      const res = await fetch(`${API_BASE}/history/${id}`);
+      const query = before !== null ? `?before=${before}` : '';
+      const res = await fetch(`${API_BASE}/history/${id}${query}`);
       if (res.ok) {
         const data = await res.json();
-        setMessages(data);
+        setMessages(prev => before !== null ? [...data.messages, ...prev] : data.messages);
+        setMessagesCursor(data.next_cursor);
       }
     } catch (err) {
       console.error("Failed to load session", err);
     }
   };
 
+  // Parse a Server-Sent Events body, yielding each event's JSON payload as it arrives
+  const readEvents = async function* (res) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true }).replace(/\r\n/g, '\n');
+
+      let boundary;
+      while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+        const block = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        const data = block
+          .split('\n')
+          .filter(line => line.startsWith('data:'))
+          .map(line => line.slice(5).trimStart())
+          .join('\n');
+        if (data) yield JSON.parse(data);
+      }
+    }
+  };
+
   const handleSendMessage = async (text) => {
     // Optimistic update
     const userMsg = { role: 'user', content: text };
     setMessages(prev => [...prev, userMsg]);
     setIsLoading(true);
 
+    // Apply an update to the assistant message being streamed (always the last one)
+    const updateAssistant = (update) => {
+      setMessages(prev => {
+        const last = prev[prev.length - 1];
+        if (last?.role !== 'assistant' || !last.streaming) {
+          return [...prev, update({ role: 'assistant', content: '', tool_calls: [], streaming: true })];
+        }
+        return [...prev.slice(0, -1), update(last)];
+      });
+    };
+
     try {
-      const res = await fetch(`${API_BASE}/chat`, {
+      const res = await fetch(`${API_BASE}/chat/stream`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -68,23 +112,46 @@ function App() {
         throw new Error("API Error");
       }
 
-      const data = await res.json();
+      let sessionId = currentSessionId;
+      for await (const event of readEvents(res)) {
+        if (event.type === 'session') {
+          sessionId = event.session_id;
+        } else if (event.type === 'tool_start') {
+          updateAssistant(msg => ({
+            ...msg,
+            tool_calls: [...msg.tool_calls, { id: event.id, name: event.name, args: event.args, status: 'running' }]
+          }));
+        } else if (event.type === 'tool_progress') {
+          // Partial results (a flight date, a page of hotels) shown until the tool finishes
+          updateAssistant(msg => ({
+            ...msg,
+            tool_calls: msg.tool_calls.map(tool => tool.id === event.id ? {
+              ...tool,
+              progress: event.progress,
+              total: event.total,
+              partials: event.message ? [...(tool.partials || []), event.message] : tool.partials
+            } : tool)
+          }));
+        } else if (event.type === 'tool_end') {
+          updateAssistant(msg => ({
+            ...msg,
+            tool_calls: msg.tool_calls.map(tool => tool.id === event.id ? { ...tool, status: 'done' } : tool)
+          }));
+        } else if (event.type === 'token') {
+          updateAssistant(msg => ({ ...msg, content: msg.content + event.text }));
+        } else if (event.type === 'done') {
+          updateAssistant(msg => ({ ...msg, content: event.response, streaming: false }));
+        } else if (event.type === 'error') {
+          throw new Error(event.detail);
+        }
+      }
 
-      // If it was a new session, update ID
+      // If it was a new session, update ID (only now, so loading it doesn't replace the stream)
       if (!currentSessionId) {
-        setCurrentSessionId(data.session_id);
-        fetchHistory(); // Refresh list to show new session
-      } else {
-        // Update last message in sidebar
-        fetchHistory();
+        setCurrentSessionId(sessionId);
       }
-
-      const aiMsg = {
-        role: 'assistant',
-        content: data.response,
-        tool_calls: data.tool_calls
-      };
-      setMessages(prev => [...prev, aiMsg]);
+      // Refresh list to show new session / update last message in sidebar
+      fetchHistory();
 
     } catch (err) {
       console.error(err);
@@ -106,9 +173,11 @@ function App() {
         currentSessionId={currentSessionId}
         onSelectSession={setCurrentSessionId}
         onNewSession={handleNewSession}
+        onLoadMore={sessionsCursor ? () => fetchHistory(sessionsCursor) : null}
       />
       <ChatInterface
         messages={messages}
+        onLoadEarlier={messagesCursor !== null ? () => loadSession(currentSessionId, messagesCursor) : null}
         onSendMessage={handleSendMessage}
         isLoading={isLoading}
       />
@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 
-const ChatInterface = ({ messages, onSendMessage, isLoading }) => {
+const ChatInterface = ({ messages, onSendMessage, isLoading, onLoadEarlier }) => {
     const [input, setInput] = useState('');
     const bottomRef = useRef(null);
 
@@ -24,6 +24,11 @@ const ChatInterface = ({ messages, onSendMessage, isLoading }) => {
     return (
         <div className="chat-container">
             <div className="messages-area">
+                {onLoadEarlier && (
+                    <button className="new-chat-btn" onClick={onLoadEarlier}>
+                        Load earlier messages
+                    </button>
+                )}
                 {messages.map((msg, idx) => (
                     <div key={idx} className="message">
                         <div className={`avatar ${msg.role === 'user' ? 'user-avatar' : 'ai-avatar'}`}>
@@ -36,8 +41,14 @@ const ChatInterface = ({ messages, onSendMessage, isLoading }) => {
                             {msg.tool_calls && msg.tool_calls.length > 0 && (
                                 <div style={{ marginTop: '8px' }}>
                                     {msg.tool_calls.map((tool, tIdx) => (
-                                        <div key={tIdx} className="tool-badge">
-                                            ⚙️ Used Tool: {tool.name}
+                                        <div key={tIdx}>
+                                            <div className="tool-badge">
+                                                {tool.status === 'running' ? `⏳ Running Tool: ${tool.name}` : `⚙️ Used Tool: ${tool.name}`}
+                                                {tool.status === 'running' && tool.total ? ` (${tool.progress}/${tool.total})` : ''}
+                                            </div>
+                                            {tool.status === 'running' && tool.partials && (
+                                                <div className="tool-partials">{tool.partials.join('\n')}</div>
+                                            )}
                                         </div>
                                     ))}
                                 </div>
@@ -45,7 +56,7 @@ const ChatInterface = ({ messages, onSendMessage, isLoading }) => {
                         </div>
                     </div>
                 ))}
-                {isLoading && (
+                {isLoading && messages[messages.length - 1]?.role !== 'assistant' && (
                     <div className="message">
                         <div className="avatar ai-avatar">AI</div>
                         <div className="message-content">
@@ -1,6 +1,6 @@
 import React from 'react';
 
-const Sidebar = ({ sessions, currentSessionId, onSelectSession, onNewSession }) => {
+const Sidebar = ({ sessions, currentSessionId, onSelectSession, onNewSession, onLoadMore }) => {
   return (
     <div className="sidebar">
       <button className="new-chat-btn" onClick={onNewSession}>
@@ -19,6 +19,11 @@ const Sidebar = ({ sessions, currentSessionId, onSelectSession, onNewSession })
               : 'New Conversation'}
           </div>
         ))}
+        {onLoadMore && (
+          <div className="history-item" onClick={onLoadMore}>
+            Load more...
+          </div>
+        )}
       </div>
     </div>
   );